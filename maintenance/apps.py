@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.core.signals import setting_changed
+
+
+def _clear_url_templates(setting, **kwargs):
+    if setting in ("ROOT_URLCONF", "FORCE_SCRIPT_NAME"):
+        from maintenance.utils import clear_url_templates
+
+        clear_url_templates()
 
 
 class MaintenanceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "maintenance"
+
+    def ready(self):
+        from maintenance.permissions import connect_permissions_models
+
+        setting_changed.connect(_clear_url_templates)
+        connect_permissions_models()
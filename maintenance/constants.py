@@ -8,6 +8,15 @@ CONTENT_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml
 CONTENT_TYPE_XLS = "application/vnd.ms-excel"
 CONTENT_TYPE_ZIP = "application/zip"
 CONTENT_TYPE_MP3 = "audio/mpeg"
+CONTENT_TYPE_CSV = "text/csv; charset=utf-8"
+CONTENT_TYPE_PARQUET = "application/vnd.apache.parquet"
+CONTENT_TYPE_ARROW = "application/vnd.apache.arrow.file"
+
+EXPORT_FORMAT_PARAM = "format"
+EXPORT_FORMAT_XLSX = "xlsx"
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_FORMAT_PARQUET = "parquet"
+EXPORT_FORMAT_ARROW = "arrow"
 
 MENU_VENTAS = "1"
 MENU_REPORTES = "2"
@@ -69,12 +78,33 @@ TODOS_STR = "TODOS"
 TODOS = ""
 
 ACCORDION_CSS_DISABLED = "bg-body-tertiary text-body-tertiary"
+HISTORY_CACHE_TIMEOUT = 60 * 60 * 24
+HISTORY_PAGE_SIZE = 20
 EMPTY_VALUE = "-"
 
 DPTO_CODIGO_LIMA = "15"
 DPTO_CODIGO_CALLAO = "07"
+UBIGEO_TREE_CHECK_SECONDS = 60
+UBIGEO_VERSION_PARAM = "v"
+UBIGEO_CACHE_CONTROL = "public, max-age=31536000, immutable"  # only with the current version
 
 TRUE_STR = "SÍ"
 FALSE_STR = "NO"
 
 RELATED_TAG = "-related"
+URL_PK_PLACEHOLDERS = ("__pk__", "918273645")
+
+JOB_STATUS_PENDING = "pending"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_DONE = "done"
+JOB_STATUS_FAILED = "failed"
+JOB_STATUS_CHOICES = (
+    (JOB_STATUS_PENDING, "Pendiente"),
+    (JOB_STATUS_RUNNING, "En proceso"),
+    (JOB_STATUS_DONE, "Terminado"),
+    (JOB_STATUS_FAILED, "Fallido"),
+)
+JOB_UPLOAD_TO = "maintenance/jobs/"
+JOB_POLL_SECONDS = 2
+JOB_RETENTION_DAYS = 7
+JOB_CLEANUP_SECONDS = 3600
@@ -1,7 +1,50 @@
+import csv
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
 from django.conf import settings
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import Case, F, When
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
 
+import pghistory
 from apps.users.models import Rol, User
+from openpyxl import Workbook
+
+from maintenance.constants import (
+    API_ACTION_EDIT,
+    API_ACTION_EXPORT,
+    API_ACTION_IMPORT,
+    API_ACTION_LIST,
+    CONTENT_TYPE_XLSX,
+    EXPORT_FORMAT_CSV,
+    EXPORT_FORMAT_PARAM,
+    EXPORT_FORMAT_PARQUET,
+    JOB_RETENTION_DAYS,
+    JOB_STATUS_DONE,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_RUNNING,
+)
+from maintenance.exports import CSV_BOM, EXPORT_CONTENT_TYPES, is_format_available
+from maintenance.forms import get_ubigeo_url
+from maintenance.history import HistoryList
+from maintenance.jobs import claim_job, delete_finished_jobs
+from maintenance.models import Departamento, Distrito, Job, Provincia
+from maintenance.pagination import CachedCountPaginator, KeysetPaginator
+from maintenance.testing import QueryBudgetTestMixin
+from maintenance.utils import clear_url_templates
+from maintenance.views import DepartamentoAPIView, DistritoAPIView, ProvinciaAPIView
 
 
 class LoginTestCase(TestCase):
@@ -58,3 +101,599 @@ class LoginTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, "maintenance/login.html")
         self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+
+class ConcurrentRequestsTestCase(TransactionTestCase):
+    """Many simultaneous requests from users with different roles must not share view state."""
+
+    fixtures = ["test_roles.json", "test_users.json"]
+    workers = 16
+    requests_per_user = 20
+
+    def setUp(self):
+        self.departamento = Departamento.objects.create(codigo="99", name="Prueba")
+        self.users = [
+            u for u in (User.objects.filter(rol=r).first() for r in Rol.objects.all()) if u
+        ]
+        self.factory = RequestFactory()
+        self.paths = {
+            API_ACTION_LIST: reverse("maintenance:departamento:list"),
+            API_ACTION_EDIT: reverse("maintenance:departamento:edit", args=(self.departamento.pk,)),
+        }
+
+    def _get_expected(self, user, action) -> dict:
+        obj = self.departamento if action == API_ACTION_EDIT else None
+        actions = (
+            DepartamentoAPIView.actions_get
+            + DepartamentoAPIView.actions_post
+            + DepartamentoAPIView.actions_delete
+        )
+        return {a: bool(user.eval_perm(a, "departamento", obj)) for a in set(actions)}
+
+    def _request(self, start, user, action) -> tuple:
+        start.wait()
+        try:
+            kwargs = {"object_pk": self.departamento.pk} if action == API_ACTION_EDIT else {}
+            request = self.factory.get(self.paths[action])
+            request.user = user
+            response = DepartamentoAPIView.as_view()(request, action=action, **kwargs)
+            context = getattr(response, "context_data", None) or {}
+            user_can = context.get("user_can", {})
+            return user, action, response.status_code, {a: user_can[a] for a in user_can}
+        finally:
+            connection.close()
+
+    def test_concurrent_list_and_edit(self):
+        jobs = [
+            (user, action)
+            for user in self.users
+            for action in self.paths
+            for _ in range(self.requests_per_user)
+        ]
+        expected = {(u.pk, a): self._get_expected(u, a) for u in self.users for a in self.paths}
+        start = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._request, start, *job) for job in jobs]
+            start.set()  # release every worker at once
+            results = [future.result() for future in futures]
+
+        for user, action, status_code, user_can in results:
+            if status_code == 200:
+                self.assertEqual(user_can, expected[(user.pk, action)])
+            else:
+                self.assertEqual(status_code, 403)
+                self.assertFalse(expected[(user.pk, action)][action])
+
+    def _get_list_urls(self, view_class, barrier, user) -> dict:
+        class InterleavedView(view_class):
+            def init_attributes(self, all_actions_allowed):
+                super().init_attributes(all_actions_allowed)
+                barrier.wait()  # the other request fills its urls before this one renders
+
+        try:
+            request = self.factory.get("/")
+            request.user = user
+            response = InterleavedView.as_view()(request, action=API_ACTION_LIST)
+            return response.context_data["urls"]
+        finally:
+            connection.close()
+
+    def test_interleaved_views_keep_their_urls(self):
+        """urls was one dict shared by every view, the last request to fill it won."""
+        user = User.objects.filter(rol__pk=1).first()  # coordinador
+        barrier = threading.Barrier(2, timeout=10)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = {
+                model_name: executor.submit(self._get_list_urls, view_class, barrier, user)
+                for model_name, view_class in (
+                    ("departamento", DepartamentoAPIView),
+                    ("provincia", ProvinciaAPIView),
+                )
+            }
+            for model_name, future in futures.items():
+                self.assertEqual(
+                    future.result()[API_ACTION_LIST], reverse(f"maintenance:{model_name}:list")
+                )
+
+
+@override_settings(MAINTENANCE_QUERY_BUDGET_EXTRA=1)  # the role read by User.eval_perm
+class QueryBudgetTestCase(QueryBudgetTestMixin, TestCase):
+    """Every action of every routed maintenance view within its query_budget."""
+
+    fixtures = ["test_roles.json", "test_users.json", "departamentos", "provincias", "distritos"]
+
+    @classmethod
+    def setUpTestData(cls):
+        """Edits made from the UI, their events hold the user and a changed foreign key."""
+        user = User.objects.filter(rol__pk=1).first()
+        departamentos = Departamento.todos.order_by("pk")
+        provincias = Provincia.todos.order_by("pk")
+        distrito = Distrito.todos.order_by("pk").first()
+        with pghistory.context(user=user.pk):
+            departamento = departamentos.first()
+            departamento.name = "RENOMBRADO"
+            departamento.save()
+            provincia = provincias.first()
+            provincia.departamento = departamentos[1]
+            provincia.save()
+            distrito.provincia = provincias[1]
+            distrito.save()
+
+    def get_query_budget_user(self):
+        return User.objects.filter(rol__pk=1).first()  # coordinador
+
+
+class MaintenanceViewTestMixin:
+    """Request a maintenance view directly, overriding its class attributes through as_view()."""
+
+    fixtures = ["test_roles.json", "test_users.json", "departamentos", "provincias", "distritos"]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.filter(rol__pk=1).first()  # coordinador
+        cls.factory = RequestFactory()
+
+    def request_view(self, view_class, action, method="get", data=None, headers=None, **initkwargs):
+        request = getattr(self.factory, method)("/", data or {}, headers=headers)
+        request.user = self.user
+        return view_class.as_view(**initkwargs)(request, action=action)
+
+
+class KeysetPaginationTestCase(MaintenanceViewTestMixin, TestCase):
+    """Cursors walk the list in the same order as the offset pages."""
+
+    def get_page(self, cursor=None):
+        response = self.request_view(
+            DistritoAPIView, API_ACTION_LIST, data={"page": cursor or 1}, keyset_pagination=True
+        )
+        return response.context_data["page_obj"]
+
+    def test_next_and_previous_cursors(self):
+        per_page = DistritoAPIView.objects_per_page
+        expected = list(
+            Distrito.todos.order_by(*DistritoAPIView.order_by).values_list("pk", flat=True)[
+                : per_page * 3
+            ]
+        )
+        pages = [self.get_page()]
+        for _ in range(2):
+            pages.append(self.get_page(pages[-1].next_page_number()))
+        self.assertEqual([obj.pk for page in pages for obj in page], expected)
+        self.assertEqual([page.number for page in pages], [1, 2, 3])
+
+        previous = self.get_page(pages[2].previous_page_number())
+        self.assertEqual([obj.pk for obj in previous], [obj.pk for obj in pages[1]])
+        self.assertEqual(previous.number, 2)
+        self.assertTrue(previous.has_previous())
+
+    def test_invalid_cursor_returns_the_first_page(self):
+        page = self.get_page("not-a-cursor")
+        self.assertEqual(page.number, 1)
+        self.assertFalse(page.has_previous())
+        self.assertEqual([obj.pk for obj in page], [obj.pk for obj in self.get_page()])
+
+    def walk(self, qs) -> list:
+        paginator = KeysetPaginator(qs, per_page=2)
+        page = paginator.get_page()
+        pks = [obj.pk for obj in page]
+        while page.has_next():
+            page = paginator.get_page(page.next_page_number())
+            pks += [obj.pk for obj in page]
+        return pks
+
+    def test_cursor_keeps_microseconds(self):
+        pks = list(Departamento.todos.order_by("pk").values_list("pk", flat=True)[:6])
+        create_date = timezone.now().replace(microsecond=0)
+        for i, pk in enumerate(pks):  # all of them in the same millisecond
+            Departamento.todos.filter(pk=pk).update(
+                create_date=create_date + timedelta(microseconds=i * 100)
+            )
+        qs = Departamento.todos.filter(pk__in=pks).order_by("-create_date")
+        self.assertEqual(self.walk(qs), pks[::-1])
+
+    def test_cursor_on_null_values(self):
+        pks = list(Departamento.todos.order_by("pk").values_list("pk", flat=True)[:6])
+        qs = (
+            Departamento.todos.filter(pk__in=pks)
+            .annotate(grupo=Case(When(pk__in=pks[::2], then=F("name")), default=None))
+            .order_by("grupo", "pk")
+        )
+        self.assertEqual(self.walk(qs), list(qs.values_list("pk", flat=True)))
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "maintenance-tests",
+        }
+    }
+)
+class ListCacheTestCase(MaintenanceViewTestMixin, TestCase):
+    """The cached list answers 304 while unchanged and a new ETag once a row is saved."""
+
+    def setUp(self):
+        cache.clear()
+
+    def get_list(self, view_class, etag=None):
+        headers = {"If-None-Match": etag} if etag else None
+        return self.request_view(
+            view_class, API_ACTION_LIST, headers=headers, list_cache_timeout=60
+        )
+
+    def test_not_modified_until_saved(self):
+        response = self.get_list(DepartamentoAPIView)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(self.get_list(DepartamentoAPIView, etag).status_code, 304)
+
+        departamento = Departamento.objects.first()
+        departamento.name = "A RENOMBRADO"  # sorts first in the list
+        with self.captureOnCommitCallbacks(execute=True):
+            departamento.save()
+
+        response = self.get_list(DepartamentoAPIView, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn(b"A RENOMBRADO", response.content)
+
+    def test_not_modified_reads_only_the_list_permissions(self):
+        evaluated = list()
+
+        class CountingView(DepartamentoAPIView):
+            def eval_perm(self, action: str) -> bool:
+                evaluated.append(action)
+                return super().eval_perm(action)
+
+        etag = self.get_list(CountingView)["ETag"]
+        evaluated.clear()
+        self.assertEqual(self.get_list(CountingView, etag).status_code, 304)
+        self.assertLessEqual(
+            set(evaluated), {API_ACTION_LIST, *CountingView.list_cache_permissions}
+        )
+
+    def test_count_refreshes_after_a_write(self):
+        def get_count():
+            qs = Departamento.objects.all()
+            return CachedCountPaginator(qs, 10, count_cache_timeout=60).count
+
+        count = get_count()
+        with self.captureOnCommitCallbacks(execute=True):
+            Departamento.objects.create(codigo="99", name="NUEVO")
+        self.assertEqual(get_count(), count + 1)
+
+    def test_related_save_invalidates(self):
+        etag = self.get_list(ProvinciaAPIView)["ETag"]
+        departamento = Departamento.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            departamento.save()
+        self.assertEqual(self.get_list(ProvinciaAPIView, etag).status_code, 200)
+
+
+def build_xlsx(headers: list, rows: list) -> SimpleUploadedFile:
+    workbook = Workbook()
+    workbook.active.append(headers)
+    for row in rows:
+        workbook.active.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile("import.xlsx", buffer.getvalue(), content_type=CONTENT_TYPE_XLSX)
+
+
+class ImportDiffTestCase(MaintenanceViewTestMixin, TestCase):
+    """Bulk imports only write new and changed rows, and the dry run writes nothing."""
+
+    def post_import(self, dry_run: bool):
+        rows = [[obj.codigo, obj.name] for obj in Departamento.todos.order_by("codigo")[:3]]
+        rows[0][1] = "RENOMBRADO"
+        rows.append(["99", "NUEVO"])
+        data = {"file": build_xlsx(["codigo", "name"], rows)}
+        if dry_run:
+            data["dry_run"] = "on"
+        response = self.request_view(
+            DepartamentoAPIView,
+            API_ACTION_IMPORT,
+            method="post",
+            data=data,
+            import_in_bulk=True,
+            import_diff=True,
+        )
+        return response, rows[0][0]
+
+    def test_dry_run_writes_nothing(self):
+        events = Departamento.pgh_event_model.objects.count()
+        response, _ = self.post_import(dry_run=True)
+        summary = response.context_data["form"].import_summary
+        self.assertEqual(
+            (len(summary.new), len(summary.changed), len(summary.unchanged)), (1, 1, 2)
+        )
+        self.assertFalse(Departamento.todos.filter(codigo="99").exists())
+        self.assertEqual(Departamento.pgh_event_model.objects.count(), events)
+
+    def test_import_writes_only_the_changes(self):
+        events = Departamento.pgh_event_model.objects.count()
+        with self.captureOnCommitCallbacks(execute=True):
+            response, renamed = self.post_import(dry_run=False)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(Departamento.todos.get(codigo=renamed).name, "RENOMBRADO")
+        self.assertEqual(Departamento.todos.get(codigo="99").name, "NUEVO")
+        self.assertEqual(Departamento.pgh_event_model.objects.count(), events + 2)
+
+
+class AtomicImportTestCase(MaintenanceViewTestMixin, TestCase):
+    """An atomic import with a bad row writes none of its rows."""
+
+    def post_import(self, **initkwargs):
+        rows = [["9901", "NUEVA 1", "01"], ["9902", "NUEVA 2", "01"], ["9903", "MALA", "XX"]]
+        data = {"file": build_xlsx(["codigo", "name", "departamento_id"], rows)}
+        response = self.request_view(
+            ProvinciaAPIView, API_ACTION_IMPORT, method="post", data=data, **initkwargs
+        )
+        self.assertEqual(response.status_code, 204)
+        return Provincia.todos.filter(codigo__startswith="99").count()
+
+    def test_atomic_import_rolls_back(self):
+        for import_in_bulk in (True, False):
+            with self.subTest(import_in_bulk=import_in_bulk):
+                self.assertEqual(
+                    self.post_import(import_atomic=True, import_in_bulk=import_in_bulk), 0
+                )
+
+    def test_bulk_import_keeps_the_valid_rows(self):
+        self.assertEqual(self.post_import(import_in_bulk=True), 2)
+
+
+class ExportFormatsTestCase(MaintenanceViewTestMixin, TestCase):
+    """Every export format holds the same headers and rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.headers = DepartamentoAPIView().get_export_headers()
+
+    def get_export(self, export_format: str, **initkwargs) -> bytes:
+        response = self.request_view(
+            DepartamentoAPIView,
+            API_ACTION_EXPORT,
+            data={EXPORT_FORMAT_PARAM: export_format},
+            **initkwargs,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], EXPORT_CONTENT_TYPES[export_format])
+        return b"".join(response.streaming_content)
+
+    def test_csv(self):
+        content = self.get_export(EXPORT_FORMAT_CSV)
+        self.assertTrue(content.startswith(CSV_BOM.encode()))  # read as UTF-8 by Excel
+        header, *rows = csv.reader(io.StringIO(content.decode("utf-8-sig")))
+        self.assertEqual(header, self.headers)
+        self.assertEqual(len(rows), Departamento.todos.count())
+
+    @skipUnless(is_format_available(EXPORT_FORMAT_PARQUET), "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow as pa
+        from pyarrow import parquet
+
+        table = parquet.read_table(io.BytesIO(self.get_export(EXPORT_FORMAT_PARQUET)))
+        self.assertEqual(table.column_names, self.headers)
+        self.assertEqual(table.num_rows, Departamento.todos.count())
+
+        field_list = {API_ACTION_EXPORT: ["codigo", "name", "create_date", "is_active"]}
+        table = parquet.read_table(
+            io.BytesIO(self.get_export(EXPORT_FORMAT_PARQUET, field_list=field_list))
+        )
+        self.assertEqual(
+            table.schema.types, [pa.string(), pa.string(), pa.timestamp("us", tz="UTC"), pa.bool_()]
+        )
+        expected = Departamento.todos.order_by(*DepartamentoAPIView.order_by)
+        self.assertEqual(table.column(3).to_pylist(), [obj.is_active for obj in expected])
+        self.assertEqual(table.column(2).to_pylist(), [obj.create_date for obj in expected])
+
+
+class ProjectionTestCase(MaintenanceViewTestMixin, TestCase):
+    """Projected rows show the same text as the ones built from model instances."""
+
+    def setUp(self):
+        # the labels of deleted catalogues are computed by the database when projected
+        distrito = Distrito.todos.order_by(*DistritoAPIView.order_by).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            distrito.provincia.delete()
+            distrito.provincia.departamento.delete()
+
+    def test_list(self):
+        rows = dict()
+        for projection in (False, True):
+            response = self.request_view(DistritoAPIView, API_ACTION_LIST, projection=projection)
+            rows[projection] = [
+                [str(cell) for cell in row.data] for row in response.context_data["row_list"]
+            ]
+        self.assertIn(Distrito.DELETED_TEXT, " ".join(rows[True][0]))
+        self.assertEqual(rows[True], rows[False])
+
+    def test_export(self):
+        content = dict()
+        for projection in (False, True):
+            response = self.request_view(
+                DistritoAPIView,
+                API_ACTION_EXPORT,
+                data={EXPORT_FORMAT_PARAM: EXPORT_FORMAT_CSV},
+                projection=projection,
+            )
+            content[projection] = b"".join(response.streaming_content)
+        self.assertIn(Distrito.DELETED_TEXT.encode(), content[True])
+        self.assertEqual(content[True], content[False])
+
+
+class HistoryTestCase(MaintenanceViewTestMixin, TestCase):
+    """The history pages walk every event once, without the edits only touching last_login."""
+
+    def walk(self, obj, per_page: int) -> list:
+        history = HistoryList(obj, per_page=per_page)
+        pgh_ids = [event.pgh_id for event in history.page]
+        while history.page.has_next():
+            history = HistoryList(obj, per_page=per_page, cursor=history.page.next_page_number())
+            pgh_ids += [event.pgh_id for event in history.page]
+        return pgh_ids
+
+    def test_pages(self):
+        departamento = Departamento.objects.first()
+        for i in range(12):  # one transaction, the events share pgh_created_at
+            departamento.name = f"NOMBRE {i}"
+            departamento.save()
+        events = departamento.pgh_event_model.objects.filter(pgh_obj=departamento)
+        self.assertEqual(
+            self.walk(departamento, 5),
+            list(events.order_by("-pgh_id").values_list("pgh_id", flat=True)),
+        )
+
+    @skipUnless(hasattr(User, "pgh_event_models"), "users are not tracked")
+    def test_hides_last_login(self):
+        self.user.first_name = "ANTES"
+        self.user.save()  # the diff of the next events is taken from this one
+        count = HistoryList(self.user).get_events().count()
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=["last_login"])
+        self.assertEqual(HistoryList(self.user).get_events().count(), count)
+
+        self.user.last_login = timezone.now()
+        self.user.first_name = "NUEVO"
+        self.user.save(update_fields=["last_login", "first_name"])
+        self.assertEqual(HistoryList(self.user).get_events().count(), count + 1)
+
+
+class NumQueriesTestCase(MaintenanceViewTestMixin, TestCase):
+    """A page of many rows costs the same queries as a page of one."""
+
+    def assertSameQueries(self, get_page):
+        get_page(1)  # warms the caches, e.g. the ubigeo tree
+        with CaptureQueriesContext(connection) as queries:
+            get_page(1)
+        with self.assertNumQueries(len(queries)):
+            get_page(20)
+
+    def test_list(self):
+        def get_page(per_page: int):
+            response = self.request_view(
+                DistritoAPIView, API_ACTION_LIST, objects_per_page=per_page
+            )
+            self.assertEqual(len(response.context_data["row_list"]), per_page)
+            response.render()
+
+        self.assertSameQueries(get_page)
+
+    def test_history(self):
+        distrito = Distrito.objects.first()
+        provincias = list(Provincia.objects.all()[:3])
+        with pghistory.context(user=self.user.pk):
+            for i in range(6):  # each event with the user and another provincia
+                distrito.provincia = provincias[i % 3]
+                distrito.name = f"NOMBRE {i}"
+                distrito.save()
+        self.assertSameQueries(
+            lambda per_page: HistoryList(distrito, per_page=per_page).get_accordion_page()
+        )
+
+
+class UbigeoTestCase(MaintenanceViewTestMixin, TestCase):
+    """The ubigeo dataset answers 304 until a departamento, provincia or distrito is saved."""
+
+    def get_ubigeo(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(reverse("maintenance:ubigeo"), headers=headers)
+
+    def test_not_modified(self):
+        response = self.get_ubigeo()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_ubigeo(response["ETag"]).status_code, 304)
+
+    def test_save_changes_the_etag(self):
+        for model in (Departamento, Provincia, Distrito):
+            with self.subTest(model=model.__name__):
+                etag = self.get_ubigeo()["ETag"]
+                obj = model.objects.first()
+                obj.name = "RENOMBRADO"
+                with self.captureOnCommitCallbacks(execute=True):
+                    obj.save()
+                response = self.get_ubigeo(etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_missing_url_is_resolved_once(self):
+        clear_url_templates()
+        self.addCleanup(clear_url_templates)
+        with patch("maintenance.utils.reverse", side_effect=NoReverseMatch) as reverse_mock:
+            self.assertIsNone(get_ubigeo_url())
+            self.assertIsNone(get_ubigeo_url())
+        self.assertEqual(reverse_mock.call_count, 1)
+
+
+class JobTestCase(TestCase):
+    """Only the user who queued a job can see it, and finished jobs expire."""
+
+    fixtures = ["test_roles.json", "test_users.json"]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.filter(rol__pk=1).first()  # coordinador
+        cls.other = User.objects.exclude(pk=cls.owner.pk).first()
+
+    def test_owner_only(self):
+        job = Job.objects.create(view="views.View", action=API_ACTION_EXPORT, user=self.owner)
+        urls = [reverse("maintenance:job", args=(job.pk,))]
+        urls.append(reverse("maintenance:job-result", args=(job.pk,)))
+        for user in (None, self.other):
+            self.client.logout()
+            if user is not None:
+                self.client.force_login(user)
+            for url in urls:
+                with self.subTest(user=user, url=url):
+                    self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(urls[0]).status_code, 200)
+
+    def test_delete_finished_jobs(self):
+        old = timezone.now() - timedelta(days=JOB_RETENTION_DAYS + 1)
+        expired = [
+            Job.objects.create(view="views.View", status=status, end_date=old)
+            for status in (JOB_STATUS_DONE, JOB_STATUS_FAILED)
+        ]
+        expired[0].result_file.save("result.csv", ContentFile(b"codigo"))
+        kept = [
+            Job.objects.create(view="views.View", status=JOB_STATUS_DONE, end_date=timezone.now()),
+            Job.objects.create(view="views.View", status=JOB_STATUS_RUNNING),
+        ]
+
+        self.assertEqual(delete_finished_jobs(JOB_RETENTION_DAYS), 2)
+        self.assertFalse(default_storage.exists(expired[0].result_file.name))
+        jobs = Job.objects.filter(pk__in=[job.pk for job in expired + kept]).order_by("pk")
+        self.assertQuerySetEqual(jobs, kept)
+
+
+class ClaimJobTestCase(TransactionTestCase):
+    """Workers claiming at the same time never take the same job."""
+
+    def _lock(self, job, locked, release):
+        try:
+            with transaction.atomic():
+                Job.objects.select_for_update().get(pk=job.pk)
+                locked.set()
+                release.wait(10)
+        finally:
+            connection.close()
+
+    def test_locked_job_is_skipped(self):
+        first, second = [Job.objects.create(view="views.View") for _ in range(2)]
+        locked, release = threading.Event(), threading.Event()
+        worker = threading.Thread(target=self._lock, args=(first, locked, release))
+        worker.start()
+        locked.wait(10)
+        try:
+            claimed = claim_job()  # another worker holds the first job
+        finally:
+            release.set()
+            worker.join()
+
+        self.assertEqual(claimed, second)
+        self.assertEqual(claim_job(), first)
+        self.assertIsNone(claim_job())
@@ -1,2 +1,6 @@
 class FormIsNotValid(Exception):
     pass
+
+
+class QueryBudgetExceeded(Exception):
+    pass
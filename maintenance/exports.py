@@ -0,0 +1,129 @@
+import csv
+import importlib.util
+import io
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import models
+
+from openpyxl import Workbook
+
+from maintenance.constants import (
+    CONTENT_TYPE_ARROW,
+    CONTENT_TYPE_CSV,
+    CONTENT_TYPE_PARQUET,
+    CONTENT_TYPE_XLSX,
+    EXPORT_FORMAT_ARROW,
+    EXPORT_FORMAT_CSV,
+    EXPORT_FORMAT_PARQUET,
+    EXPORT_FORMAT_XLSX,
+)
+
+EXPORT_CONTENT_TYPES = {
+    EXPORT_FORMAT_XLSX: CONTENT_TYPE_XLSX,
+    EXPORT_FORMAT_CSV: CONTENT_TYPE_CSV,
+    EXPORT_FORMAT_PARQUET: CONTENT_TYPE_PARQUET,
+    EXPORT_FORMAT_ARROW: CONTENT_TYPE_ARROW,
+}
+ARROW_FORMATS = (EXPORT_FORMAT_PARQUET, EXPORT_FORMAT_ARROW)
+CSV_BOM = "\ufeff"
+TYPED_FIELDS = (
+    models.BooleanField,
+    models.IntegerField,
+    models.FloatField,
+    models.DecimalField,
+    models.DateField,
+)
+
+
+def is_format_available(export_format: str) -> bool:
+    """Arrow and Parquet need the optional pyarrow package."""
+    if export_format in ARROW_FORMATS:
+        return importlib.util.find_spec("pyarrow") is not None
+    return export_format in EXPORT_CONTENT_TYPES
+
+
+def write_xlsx(file, title: str, headers: list, rows) -> None:
+    """Write rows one by one to a write-only workbook."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])  # Excel title limit
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(file)
+
+
+def iter_csv(headers: list, rows):
+    """CSV lines to be streamed as they are generated, in UTF-8.
+
+    It starts with a byte order mark, without it Excel reads the file in the ANSI code page and
+    garbles accented names.
+    """
+    yield CSV_BOM
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chain([headers], rows):
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def write_csv(file, headers: list, rows) -> None:
+    for line in iter_csv(headers, rows):
+        file.write(line.encode())
+
+
+def is_typed_field(field) -> bool:
+    """Whether Parquet and Arrow export the raw value of the field instead of its text."""
+    return isinstance(field, TYPED_FIELDS) and not field.choices
+
+
+def get_arrow_type(field):
+    """Arrow type of the column of a model field, text for None and the untyped fields."""
+    import pyarrow as pa
+
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    elif isinstance(field, models.IntegerField):
+        return pa.int64()
+    elif isinstance(field, models.FloatField):
+        return pa.float64()
+    elif isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    elif isinstance(field, models.DateTimeField):
+        return pa.timestamp("us", tz="UTC" if settings.USE_TZ else None)
+    elif isinstance(field, models.DateField):
+        return pa.date32()
+    return pa.string()
+
+
+def write_arrow(
+    file, headers: list, rows, export_format: str, batch_size: int, fields: list | None = None
+) -> None:
+    """Columnar export as Parquet or Arrow IPC file, batch_size rows in memory at a time.
+
+    Each column is typed after its model field in fields, the others are written as text.
+    """
+    import pyarrow as pa
+
+    types = [get_arrow_type(field) for field in fields or [None] * len(headers)]
+    schema = pa.schema(list(zip(headers, types)))
+    if export_format == EXPORT_FORMAT_PARQUET:
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(file, schema)
+    else:
+        writer = pa.ipc.new_file(file, schema)
+
+    rows = iter(rows)
+    with writer:
+        while batch := list(islice(rows, batch_size)):
+            columns = [
+                [
+                    value if value is None or arrow_type != pa.string() else str(value)
+                    for value in column
+                ]
+                for column, arrow_type in zip(zip(*batch), types)
+            ]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
@@ -1,8 +1,13 @@
 from django import forms
 from django.db.models import QuerySet
 from django.forms.renderers import TemplatesSetting
+from django.urls import NoReverseMatch
+from django.utils.http import urlencode
 
+from maintenance.constants import UBIGEO_VERSION_PARAM
 from maintenance.models import Departamento, Distrito, Provincia
+from maintenance.ubigeo import DISTRITO, PROVINCIA, UBIGEO_PARENTS, get_ubigeo_tree
+from maintenance.utils import get_action_url
 from maintenance.validators import is_xlsx
 
 
@@ -100,10 +105,15 @@ class ImportForm(forms.Form, BootstrapFormatMixin):
     template_name = "maintenance/forms/import_form.html"
 
     file = forms.FileField(label="Archivo", required=True, validators=(is_xlsx,))
+    dry_run = forms.BooleanField(label="Solo previsualizar los cambios", required=False)
 
     def __init__(self, *args, **kwargs):
         _ = kwargs.pop("user", None)
+        dry_run = kwargs.pop("dry_run", False)
         super().__init__(*args, **kwargs)
+        if not dry_run:
+            del self.fields["dry_run"]
+        self.import_summary = None  # ImportDiff of a dry run
         self.format_fields()
 
 
@@ -131,7 +141,51 @@ class DistritoEditForm(MaintenanceBaseModelForm):
         fields = ("name", "codigo", "provincia")
 
 
+def get_ubigeo_url() -> str | None:
+    """Url of the current ubigeo dataset, None when maintenance.urls is not included."""
+    try:
+        url = get_action_url("maintenance:ubigeo")
+    except NoReverseMatch:
+        return None
+    return f"{url}?{urlencode({UBIGEO_VERSION_PARAM: get_ubigeo_tree().etag})}"
+
+
 class UbigeoFormMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_ubigeo_choices()
+        self.set_ubigeo_attrs()
+
+    def set_ubigeo_choices(self) -> None:
+        """Options of provincia and distrito from the cached ubigeo tree.
+
+        The querysets only validate the submitted value, rendering the selects runs no query.
+        """
+        for level, get_queryset, get_choices in (
+            (PROVINCIA, self._get_provincia_queryset, self._get_provincia_choices),
+            (DISTRITO, self._get_distrito_queryset, self._get_distrito_choices),
+        ):
+            field = self.fields.get(level)
+            if not isinstance(field, forms.ModelChoiceField):
+                continue
+            field.queryset = get_queryset()
+            empty_choice = [] if field.empty_label is None else [("", field.empty_label)]
+            field.choices = empty_choice + get_choices()
+
+    def set_ubigeo_attrs(self) -> None:
+        """Let loadUbigeoSelects() fill provincia and distrito from the cached ubigeo dataset."""
+        if (url := get_ubigeo_url()) is None:
+            return
+        for level, parent_level in UBIGEO_PARENTS.items():
+            if parent_level in self.fields and level in self.fields:
+                self.fields[level].widget.attrs.update(
+                    {
+                        "data-ubigeo-url": url,
+                        "data-ubigeo-level": level,
+                        "data-ubigeo-parent": self.add_prefix(parent_level),
+                    }
+                )
+
     def _get_provincia_queryset(self) -> QuerySet:
         return (
             Provincia.objects.filter(departamento_id=self.data["departamento"])
@@ -146,8 +200,16 @@ class UbigeoFormMixin:
             else Distrito.objects.none()
         )
 
+    def _get_provincia_choices(self) -> list:
+        departamento = self.data.get("departamento") if self.is_bound else None
+        return get_ubigeo_tree().get_choices(PROVINCIA, departamento) if departamento else []
+
+    def _get_distrito_choices(self) -> list:
+        provincia = self.data.get("provincia") if self.is_bound else None
+        return get_ubigeo_tree().get_choices(DISTRITO, provincia) if provincia else []
+
 
-class UbigeoModelFormMixin:
+class UbigeoModelFormMixin(UbigeoFormMixin):
     def _get_provincia_queryset(self) -> QuerySet:
         if self.is_bound and self.data.get("departamento"):
             departamento = self.data["departamento"]
@@ -165,3 +227,21 @@ class UbigeoModelFormMixin:
         else:
             return Distrito.objects.none()
         return Distrito.objects.filter(provincia_id=provincia)
+
+    def _get_provincia_choices(self) -> list:
+        if self.is_bound and self.data.get("departamento"):
+            departamento = self.data["departamento"]
+        elif self.instance.pk is not None:
+            departamento = self.instance.departamento_id
+        else:
+            return []
+        return get_ubigeo_tree().get_choices(PROVINCIA, departamento)
+
+    def _get_distrito_choices(self) -> list:
+        if self.is_bound and self.data.get("provincia"):
+            provincia = self.data["provincia"]
+        elif self.instance.pk is not None:
+            provincia = self.instance.provincia_id
+        else:
+            return []
+        return get_ubigeo_tree().get_choices(DISTRITO, provincia)
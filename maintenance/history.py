@@ -1,6 +1,14 @@
+from collections import defaultdict
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
+from django.db.models import Q, QuerySet
+from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
 
 from pghistory.models import Events
@@ -13,16 +21,23 @@ from maintenance.constants import (
     API_ACTION_REACTIVATE_STR,
     API_ACTION_RESET_STR,
     DATETIME_FORMAT,
+    HISTORY_CACHE_TIMEOUT,
+    HISTORY_PAGE_SIZE,
 )
+from maintenance.pagination import KeysetPage, KeysetPaginator
 from maintenance.utils import true_false_str
+from maintenance.versions import get_model_versions
 
 User = get_user_model()
+HISTORY_TEMPLATE = "maintenance/components/history.html"
 
 
 class History:
-    def __init__(self, event, obj):
+    def __init__(self, event, obj, users: dict | None = None, related_objects: dict | None = None):
         self.event = event
         self.obj = obj
+        self.users = users  # {str(pk): user}, resolved by HistoryList
+        self.related_objects = related_objects or {}  # {model: {str(pk): obj}}
         self.diffs = self._get_cleaned_diffs()
         self.show_accordion = True
         self.accordion_body = bool(self.diffs)
@@ -44,60 +59,22 @@ class History:
             pass
         return cleaned_diffs
 
-    def get_accordion_item(self, parent_id) -> str:
-        html = ""
-        if self.show_accordion:
-            child = f"collapse-{self.id}"
-            html += f"""
-            <div class="accordion-item">
-              <h2 class="accordion-header">
-                <button class="accordion-button collapsed
-                        {'' if self.accordion_body else ACCORDION_CSS_DISABLED}"
-                        type="button" data-bs-toggle="collapse"
-                        data-bs-target="#{child}" aria-expanded="false" aria-controls="{child}">
-                {self.accion.upper()} - {self.user or self.empty_user} -
-                {self.datetime.strftime(DATETIME_FORMAT)}
-                </button>
-              </h2>
-            """
-            if self.diffs and self.accordion_body:
-                html += f"""
-                    <div id="{child}" class="accordion-collapse collapse"
-                       data-bs-parent="#{parent_id}">
-                    <div class="accordion-body">
-                    <table class="table table-sm border-1">
-                    <thead>
-                    <tr>
-                    <th>#</th>
-                    <th>Atributo modificado</th>
-                    <th>Antes</th>
-                    <th>Después</th>
-                    </tr>
-                    </thead>
-                    <tbody>
-                    """
-                counter = 1
-                for k, v in self.diffs.items():
-                    if k not in "password":  # force to hide sensitive info
-                        name, before, after = self._process_field(k, v)
-                        html += f"""
-                            <tr>
-                            <td>{counter}</td>
-                            <td class="align-middle">{name.title()}</td>
-                            <td class="align-middle">{before}</td>
-                            <td class="align-middle">{after}</td>
-                            </tr>
-                        """
-                        counter += 1
-
-                html += """
-                    </tbody>
-                    </table>
-                    </div>
-                  </div>
-                """
-            html += "</div>"
-        return html
+    @property
+    def button_css(self) -> str:
+        return "" if self.accordion_body else ACCORDION_CSS_DISABLED
+
+    @property
+    def datetime_str(self) -> str:
+        return self.datetime.strftime(DATETIME_FORMAT)
+
+    @cached_property
+    def rows(self) -> list:
+        rows = list()
+        for k, v in self.diffs.items():
+            if k not in "password":  # force to hide sensitive info
+                name, before, after = self._process_field(k, v)
+                rows.append((name.title(), before, after))
+        return rows
 
     def _process_field(self, key: str, value: list) -> tuple[str, str, str]:
         field = self.obj._meta.get_field(key)
@@ -117,8 +94,8 @@ class History:
             )
         elif isinstance(field, models.ForeignKey):
             related_model = field.related_model
-            before = str(related_model.todos.get(pk=before)) if before else self.empty
-            after = str(related_model.todos.get(pk=after)) if after else self.empty
+            before = str(self._get_related_object(related_model, before)) if before else self.empty
+            after = str(self._get_related_object(related_model, after)) if after else self.empty
         elif isinstance(field, models.BooleanField):
             before = true_false_str(before)
             after = true_false_str(after)
@@ -138,9 +115,16 @@ class History:
             after = after or self.empty
         return name, before, after
 
+    def _get_related_object(self, related_model, pk):
+        if related_model in self.related_objects:
+            return self.related_objects[related_model].get(str(pk), pk)
+        return related_model.todos.get(pk=pk)
+
     def _get_user(self) -> User | None:
         user = None
         if self.context and "user" in self.context:
+            if self.users is not None:
+                return self.users.get(str(self.context.get("user")))
             try:
                 user = User.todos.select_related("role").get(pk=self.context.get("user"))
             except User.DoesNotExist:
@@ -172,25 +156,125 @@ class History:
 
 
 class HistoryList:
-    def __init__(self, history_object):
+    """Newest events of an object, per_page at a time, older pages are fetched with cursors."""
+
+    def __init__(
+        self,
+        history_object,
+        per_page: int = HISTORY_PAGE_SIZE,
+        cursor: str | None = None,
+        url: str = "",
+    ):
         self.history_object = history_object
-        self.items = self._get_items()
+        self.per_page = per_page
+        self.cursor = cursor
+        self.url = url
 
-    def _get_items(self) -> list:
-        items = list()
-        try:
-            events = Events.objects.tracks(self.history_object)
-        except Events.DoesNotExist:
-            pass
+    def get_events(self) -> QuerySet:
+        """Events of the object, newest first, without the ones only touching last_login.
+
+        With a single event table the pgh_id sequence gives the order, events of one transaction
+        share pgh_created_at. Several tables are ordered by time, pgh_id breaking the ties.
+        """
+        events = Events.objects.tracks(self.history_object)
+        event_models = set(getattr(self.history_object, "pgh_event_models", {}).values())
+        if len(event_models) == 1:
+            events = events.across(*event_models)
+            ordering = ("-pgh_id",)
         else:
-            for event in events:
-                items.append(History(event, self.history_object))
-        return items
+            ordering = ("-pgh_created_at", "-pgh_id")
+        field_names = {
+            name for f in self.history_object._meta.concrete_fields for name in (f.name, f.attname)
+        }
+        if "last_login" in field_names:
+            others = field_names - {"last_login", "modify_date"}
+            events = events.exclude(
+                Q(pgh_diff__isnull=False)
+                & Q(pgh_diff__has_key="last_login")
+                & ~Q(pgh_diff__has_any_keys=sorted(others))
+            )
+        return events.order_by(*ordering)
+
+    @cached_property
+    def page(self) -> KeysetPage:
+        return KeysetPaginator(self.get_events(), self.per_page).get_page(self.cursor)
+
+    @cached_property
+    def items(self) -> list:
+        return self._get_items()
+
+    @property
+    def next_url(self) -> str:
+        if not self.page.has_next():
+            return ""
+        return f"{self.url}?{urlencode({'page': self.page.next_page_number()})}"
+
+    def _get_items(self) -> list:
+        events = list(self.page)
+        users, related_objects = self._get_lookups(events)
+        return [History(event, self.history_object, users, related_objects) for event in events]
+
+    def _get_lookups(self, events: list) -> tuple[dict, dict]:
+        """Resolve users and foreign keys of every event with one in_bulk query per model."""
+        user_pks = set()
+        related_pks = defaultdict(set)
+        for event in events:
+            if event.pgh_context and event.pgh_context.get("user"):
+                user_pks.add(event.pgh_context["user"])
+            for key, value in (event.pgh_diff or {}).items():
+                try:
+                    field = self.history_object._meta.get_field(key)
+                except FieldDoesNotExist:
+                    continue
+                if isinstance(field, models.ForeignKey):
+                    related_pks[field.related_model].update(pk for pk in value if pk)
+
+        users = {
+            str(pk): user
+            for pk, user in User.todos.select_related("role").in_bulk(user_pks).items()
+        }
+        related_objects = {
+            related_model: {str(pk): obj for pk, obj in related_model.todos.in_bulk(pks).items()}
+            for related_model, pks in related_pks.items()
+        }
+        return users, related_objects
+
+    def _get_latest_event_id(self):
+        events = getattr(self.history_object, "events", None)  # pghistory related_name
+        if events is not None:
+            return events.order_by("-pgh_id").values_list("pgh_id", flat=True).first()
+        events = Events.objects.tracks(self.history_object).order_by("-pgh_created_at")
+        return events.values_list("pgh_slug", flat=True).first()
+
+    def get_cache_key(self) -> str:
+        """Changes with every new event of the object and every write on users or related models."""
+        obj = self.history_object
+        related_models = [
+            f.related_model for f in obj._meta.concrete_fields if isinstance(f, models.ForeignKey)
+        ]
+        parts = (self._get_latest_event_id(), *get_model_versions(User, *related_models))
+        return ":".join(
+            str(p)
+            for p in ("maintenance:history", obj._meta.label_lower, obj.pk, self.url, self.per_page)
+            + parts
+        )
+
+    def get_context(self) -> dict:
+        return {
+            "items": self.items,
+            "next_url": self.next_url,
+            "parent_id": f"parent_{self.history_object.pk}",
+        }
 
     def get_accordion(self) -> str:
-        parent_id = f"parent_{self.history_object.pk}"
-        html = f'<div class="accordion" id="{parent_id}">'
-        for item in self.items:
-            html += item.get_accordion_item(parent_id)
-        html += "</div>"
+        """First page of the accordion, cached until the object gets a new event."""
+        key = self.get_cache_key()
+        html = cache.get(key)
+        if html is None:
+            html = render_to_string(f"{HISTORY_TEMPLATE}#accordion", self.get_context())
+            cache.set(key, html, HISTORY_CACHE_TIMEOUT)
         return mark_safe(html)
+
+    def get_accordion_page(self) -> str:
+        """Items of the page at cursor plus the trigger of the next one, for infinite scroll."""
+        return render_to_string(f"{HISTORY_TEMPLATE}#accordion-page", self.get_context())
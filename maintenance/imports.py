@@ -0,0 +1,230 @@
+import dataclasses
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+
+from openpyxl import load_workbook
+
+
+class XlsxRows:
+    """(row_number, {header: value}) of the non empty rows of the active sheet.
+
+    The sheet is read in streaming mode while the rows are iterated, only one row is kept in
+    memory at a time and columns without header are skipped. The workbook and its headers are
+    read at once, so an invalid file raises here, ValueError when the sheet has no headers.
+    """
+
+    def __init__(self, file):
+        self.workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            sheet = self.workbook.active
+            self.rows = sheet.iter_rows(values_only=True)
+            headers = next(self.rows, None) or ()
+            self.columns = [(i, header) for i, header in enumerate(headers) if header is not None]
+            if not self.columns:
+                raise ValueError("The sheet has no headers")
+        except Exception:
+            self.workbook.close()
+            raise
+        self.headers = [header for _, header in self.columns]
+        self.total = max((sheet.max_row or 1) - 1, 0)  # from the dimension stored in the file
+        self.read = 0
+        self.empty = 0
+
+    def __iter__(self):
+        try:
+            for row_number, values in enumerate(self.rows, start=2):  # row 1 holds the headers
+                self.read = row_number - 1
+                data = {
+                    header: values[i] if i < len(values) else None for i, header in self.columns
+                }
+                if not any(data.values()):
+                    self.empty += 1
+                    continue
+                yield row_number, data
+        finally:
+            self.workbook.close()
+
+
+def iter_chunks(rows, chunk_size: int):
+    chunk = list()
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = list()
+    if chunk:
+        yield chunk
+
+
+def get_import_error_msg(e: Exception) -> str:
+    return ", ".join(e.messages) if hasattr(e, "messages") else str(e)
+
+
+def _get_fk_fields(model) -> list:
+    return [f for f in model._meta.concrete_fields if f.is_relation]
+
+
+def get_fk_keys(model, rows: list) -> dict:
+    """Existing keys of every foreign key referenced by rows, one query per foreign key."""
+    fk_keys = dict()
+    for field in _get_fk_fields(model):
+        values = set()
+        for _, data in rows:
+            try:
+                values.add(field.target_field.to_python(data.get(field.attname)))
+            except ValidationError:
+                continue
+        values.discard(None)
+        fk_keys[field.attname] = set(
+            field.related_model._base_manager.filter(pk__in=values).values_list("pk", flat=True)
+        )
+    return fk_keys
+
+
+def validate_import_chunk(model_label: str, chunk: list, fk_keys: dict, build=None) -> tuple:
+    """Build and validate the rows of a chunk without touching the database.
+
+    Runs in the pool workers, so only picklable arguments are received: the model label, the
+    (row_number, data) rows and the prefetched foreign keys. Objects are built with the model
+    constructor unless a build callable is given.
+    """
+    model = apps.get_model(model_label)
+    fk_fields = _get_fk_fields(model)
+    objs = list()
+    row_errors = list()
+    for row_number, data in chunk:
+        try:
+            obj = build(data) if build else model(**data)
+            obj.normalize_fields()
+            obj.full_clean(
+                exclude=[f.name for f in fk_fields],
+                validate_unique=False,
+                validate_constraints=False,
+            )
+            for field in fk_fields:
+                value = getattr(obj, field.attname)
+                if value is None:
+                    continue
+                value = field.target_field.to_python(value)
+                if value not in fk_keys[field.attname]:
+                    raise ValidationError(f"{field.verbose_name} {value} no existe")
+                setattr(obj, field.attname, value)
+        except Exception as e:  # NOQA
+            row_errors.append((row_number, get_import_error_msg(e)))
+        else:
+            objs.append((row_number, obj))
+    return objs, row_errors
+
+
+def _init_worker():
+    import django
+
+    if not apps.ready:
+        django.setup()
+
+
+def iter_validated_chunks(model, rows, chunk_size: int = 500, workers: int = 0, build=None):
+    """(objs, row_errors) of every chunk of rows, in the order of the file.
+
+    rows are read as the chunks are validated, across a pool of worker processes when workers
+    is given. At most two chunks per worker are read ahead. Workers are spawned, not forked, so
+    they never share the database connections of the request, and they build objects with the
+    model constructor, a build callable can't be sent to them. Rows repeating a unique value of
+    a previous row of the file are reported as errors.
+    """
+    if workers and build is not None:
+        raise ValueError("build can't be used by the worker processes")
+    label = model._meta.label
+    chunks = iter_chunks(rows, chunk_size)
+    head = list(islice(chunks, 2))  # a single chunk is validated without a pool
+    unique_fields = [f.attname for f in model._meta.concrete_fields if f.unique]
+    seen = {attname: set() for attname in unique_fields}
+
+    if not workers or len(head) < 2:
+        for chunk in chain(head, chunks):
+            objs, row_errors = validate_import_chunk(label, chunk, get_fk_keys(model, chunk), build)
+            yield _drop_repeated(seen, objs, row_errors)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    ) as pool:
+        pending = deque()
+        for chunk in chain(head, chunks):
+            fk_keys = get_fk_keys(model, chunk)
+            pending.append(pool.submit(validate_import_chunk, label, chunk, fk_keys))
+            if len(pending) >= workers * 2:
+                yield _drop_repeated(seen, *pending.popleft().result())
+        while pending:
+            yield _drop_repeated(seen, *pending.popleft().result())
+
+
+def _drop_repeated(seen: dict, objs: list, row_errors: list) -> tuple[list, list]:
+    """Objects whose unique values weren't in seen, which is updated with theirs."""
+    valid_objs = list()
+    for row_number, obj in objs:
+        for attname, values in seen.items():
+            value = getattr(obj, attname)
+            if value is not None and value in values:
+                row_errors.append((row_number, f"{value} duplicado en el archivo"))
+                break
+        else:
+            for attname, values in seen.items():
+                values.add(getattr(obj, attname))
+            valid_objs.append((row_number, obj))
+    row_errors.sort(key=lambda error: error[0])
+    return valid_objs, row_errors
+
+
+@dataclasses.dataclass()
+class ImportDiff:
+    """Validated rows classified against the table, only new and changed ones are written."""
+
+    new: list = dataclasses.field(default_factory=list)
+    changed: list = dataclasses.field(default_factory=list)
+    unchanged: list = dataclasses.field(default_factory=list)
+    invalid: list = dataclasses.field(default_factory=list)  # (row_number, error)
+
+    def update(self, other: "ImportDiff") -> None:
+        self.new += other.new
+        self.changed += other.changed
+        self.unchanged += other.unchanged
+        self.invalid += other.invalid
+
+    @property
+    def changes(self) -> list:
+        return sorted(self.new + self.changed, key=lambda row: row[0])
+
+    def get_summary(self) -> str:
+        return (
+            f"{len(self.new)} nuevos, {len(self.changed)} modificados, "
+            f"{len(self.unchanged)} sin cambios, {len(self.invalid)} con errores"
+        )
+
+
+def get_import_diff(model, objs: list, row_errors: list, fields: list) -> ImportDiff:
+    """Compare every (row_number, obj) with its stored row, fetched all in one query."""
+    attnames = [f.attname for f in fields]
+    existing = {
+        values[0]: values[1:]
+        for values in model._base_manager.filter(pk__in=[obj.pk for _, obj in objs]).values_list(
+            "pk", *attnames
+        )
+    }
+    diff = ImportDiff(invalid=list(row_errors))
+    for row_number, obj in objs:
+        values = existing.get(obj.pk)
+        if values is None:
+            diff.new.append((row_number, obj))
+        elif tuple(getattr(obj, attname) for attname in attnames) != values:
+            diff.changed.append((row_number, obj))
+        else:
+            diff.unchanged.append((row_number, obj))
+    return diff
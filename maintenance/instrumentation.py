@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from maintenance.exceptions import QueryBudgetExceeded
+
+
+@contextmanager
+def wrap_connections(wrapper):
+    """Install wrapper as execute_wrapper of every database connection of this thread."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield wrapper
+
+
+class ActionTiming:
+    """Measures of one request, installed as execute_wrapper of every database connection."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.model_name = None
+        self.action = None
+        self.span = None
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.template_start = None
+        self.template_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_ms += (time.perf_counter() - start) * 1000
+
+    @property
+    def wall_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def start_template(self, response) -> None:
+        self.template_start = time.perf_counter()
+        response.add_post_render_callback(self.end_template)
+
+    def end_template(self, response) -> None:
+        self.template_ms += (time.perf_counter() - self.template_start) * 1000
+
+    def get_server_timing(self) -> str:
+        return (
+            f'app;dur={self.wall_ms:.1f};desc="{self.model_name} {self.action}", '
+            f'db;dur={self.sql_ms:.1f};desc="{self.queries} queries", '
+            f"tpl;dur={self.template_ms:.1f}"
+        )
+
+
+class ActionStats:
+    """Totals per model and action of the requests served by this process.
+
+    Every worker process keeps its own, they are lost on restart.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.since = timezone.now()
+            self._stats = dict()
+
+    def add(self, timing: ActionTiming, size: int) -> None:
+        wall_ms = timing.wall_ms
+        with self._lock:
+            stats = self._stats.setdefault(
+                (timing.model_name, timing.action),
+                {
+                    "count": 0,
+                    "wall_ms": 0.0,
+                    "max_wall_ms": 0.0,
+                    "queries": 0,
+                    "max_queries": 0,
+                    "sql_ms": 0.0,
+                    "template_ms": 0.0,
+                    "bytes": 0,
+                },
+            )
+            stats["count"] += 1
+            stats["wall_ms"] += wall_ms
+            stats["max_wall_ms"] = max(stats["max_wall_ms"], wall_ms)
+            stats["queries"] += timing.queries
+            stats["max_queries"] = max(stats["max_queries"], timing.queries)
+            stats["sql_ms"] += timing.sql_ms
+            stats["template_ms"] += timing.template_ms
+            stats["bytes"] += size
+
+    def get_stats(self) -> list:
+        """Totals and averages of every model and action, the most time consuming first."""
+        with self._lock:
+            items = [(key, dict(stats)) for key, stats in self._stats.items()]
+        result = list()
+        for (model_name, action), stats in items:
+            count = stats["count"]
+            result.append(
+                {
+                    "model": model_name,
+                    "action": action,
+                    **stats,
+                    "avg_wall_ms": stats["wall_ms"] / count,
+                    "avg_queries": stats["queries"] / count,
+                    "avg_sql_ms": stats["sql_ms"] / count,
+                    "avg_template_ms": stats["template_ms"] / count,
+                    "avg_bytes": stats["bytes"] / count,
+                }
+            )
+        result.sort(key=lambda stats: stats["wall_ms"], reverse=True)
+        return result
+
+
+action_stats = ActionStats()
+
+
+def is_query_budget_enforced() -> bool:
+    return getattr(settings, "MAINTENANCE_QUERY_BUDGET", False)
+
+
+class QueryLog:
+    """SQL of the queries executed while installed, as execute_wrapper."""
+
+    def __init__(self):
+        self.queries = list()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def check_budget(self, label: str, budget: int) -> None:
+        """Raise QueryBudgetExceeded listing the queries, repeated ones (N+1) first."""
+        if len(self.queries) <= budget:
+            return
+        lines = [f"{count}x {sql}" for sql, count in Counter(self.queries).most_common()]
+        raise QueryBudgetExceeded(
+            f"{label} executed {len(self.queries)} queries, its budget is {budget}:\n"
+            + "\n".join(lines)
+        )
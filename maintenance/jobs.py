@@ -0,0 +1,94 @@
+import logging
+from datetime import timedelta
+
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+import pghistory
+
+from maintenance.constants import (
+    JOB_STATUS_DONE,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_PENDING,
+    JOB_STATUS_RUNNING,
+)
+from maintenance.models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_job(view, file=None) -> Job:
+    """Store the action of a MaintenanceAPIView request, with its querystring and upload.
+
+    Only the user who queued a job can poll it or download its result, anonymous users can't.
+    """
+    if not getattr(view.user, "is_authenticated", False):
+        raise PermissionDenied("Las tareas requieren un usuario autenticado")
+    view_class = type(view)
+    job = Job(
+        view=f"{view_class.__module__}.{view_class.__qualname__}",
+        action=view.action,
+        params=dict(view.request.GET.lists()),
+        user=view.user,
+    )
+    if file is not None:
+        job.input_file.save(file.name, file, save=False)
+    job.save()
+    return job
+
+
+def claim_job() -> Job | None:
+    """Oldest pending job, locked so concurrent workers never take the same one."""
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=JOB_STATUS_PENDING)
+            .order_by("pk")
+            .first()
+        )
+        if job is not None:
+            job.status = JOB_STATUS_RUNNING
+            job.start_date = timezone.now()
+            job.save(update_fields=("status", "start_date"))
+    return job
+
+
+def run_job(job: Job) -> None:
+    try:
+        view = import_string(job.view)()
+        with pghistory.context(user=job.user_id):
+            success, msg = view.run_job(job)
+    except Exception as e:  # NOQA
+        logger.exception(f"Error running job {job.pk}: {e}")
+        success, msg = False, str(e)
+
+    job.status = JOB_STATUS_DONE if success else JOB_STATUS_FAILED
+    job.progress = 100
+    job.message = msg
+    job.end_date = timezone.now()
+    job.save(update_fields=("status", "progress", "message", "result_file", "end_date"))
+
+
+def delete_finished_jobs(days: int) -> int:
+    """Delete the jobs finished more than days ago, with their upload and result files."""
+    jobs = Job.objects.filter(
+        status__in=(JOB_STATUS_DONE, JOB_STATUS_FAILED),
+        end_date__lt=timezone.now() - timedelta(days=days),
+    )
+    deleted = 0
+    for job in jobs.iterator():
+        for file in (job.input_file, job.result_file):
+            if file:
+                file.delete(save=False)
+        job.delete()
+        deleted += 1
+    return deleted
+
+
+def set_job_progress(job: Job, done: int, total: int) -> None:
+    progress = min(99, done * 100 // total) if total else 0
+    if progress != job.progress:
+        job.progress = progress
+        Job.objects.filter(pk=job.pk).update(progress=progress)
@@ -0,0 +1,62 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from maintenance.constants import API_ACTION_EXPORT, API_ACTION_LIST
+from maintenance.management.commands.benchmark_rows import get_view_class
+
+
+class Command(BaseCommand):
+    help = "Rows per second of list and export with model instances against values_list projection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", default="maintenance.distrito", help="app_label.model")
+        parser.add_argument("--rows", type=int, default=2000, help="Rows rendered as a list page")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def _get_view(self, view_class, action: str, projection: bool, rows: int):
+        view = view_class(projection=projection, objects_per_page=rows)
+        view.setup(RequestFactory().get("/"))
+        view.action = action
+        view.model_name = view.model._meta.model_name
+        view.init_attributes(set())
+        return view
+
+    def _measure(self, run, repeat: int) -> tuple[float, int, int]:
+        best = None
+        for _ in range(repeat):
+            reset_queries()
+            start = time.perf_counter()
+            count = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return (count / best if best else 0.0), count, len(connection.queries)
+
+    def _list(self, view) -> int:
+        view.object_list = view.get_queryset()[: view.objects_per_page]
+        return len(view.get_row_list(view.field_list[API_ACTION_LIST]))
+
+    def _export(self, view) -> int:
+        return sum(1 for _ in view.iter_export_rows())
+
+    @override_settings(DEBUG=True)
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        view_class = get_view_class(model)
+        self.stdout.write(f"{model._meta.label} with {view_class.__name__}")
+        for action, run in ((API_ACTION_LIST, self._list), (API_ACTION_EXPORT, self._export)):
+            for projection in (False, True):
+                view = self._get_view(view_class, action, projection, options["rows"])
+                rate, count, queries = self._measure(lambda: run(view), options["repeat"])
+                mode = "values_list projection" if projection else "model instances"
+                self.stdout.write(
+                    f"{action:<7} {mode:<23} {count} rows, {queries} queries: {rate:,.0f} rows/s"
+                )
@@ -0,0 +1,86 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+
+from maintenance.constants import API_ACTION_LIST
+from maintenance.rows import get_row_plan
+from maintenance.views import MaintenanceAPIView
+
+LEGACY_TEMPLATE = """{% for row in row_list %}{% for data in row.data %}
+<td class="align-middle {{ data.class }}">
+  {% if data.value == 'True' or data.value == 'False' %}
+    {% with value=data.value %}
+      {% include "maintenance/components/icons.html#true-false" %}
+    {% endwith %}
+  {% else %}
+    {{ data.value }}
+  {% endif %}
+</td>
+{% endfor %}{% endfor %}"""
+
+COMPILED_TEMPLATE = """{% for row in row_list %}{% for data in row.data %}
+<td class="align-middle">{{ data.html }}</td>
+{% endfor %}{% endfor %}"""
+
+
+def get_view_class(model):
+    pending = list(MaintenanceAPIView.__subclasses__())
+    while pending:
+        view_class = pending.pop(0)
+        if view_class.model is model and not view_class.is_related:
+            return view_class
+        pending.extend(view_class.__subclasses__())
+    return MaintenanceAPIView
+
+
+class Command(BaseCommand):
+    help = "Rows per second rendering list cells with get_row_data against the compiled RowPlan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", default="maintenance.distrito", help="app_label.model")
+        parser.add_argument("--rows", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def _measure(self, build_rows, template, objs, repeat: int) -> float:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            template.render({"row_list": build_rows(objs)})
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return len(objs) / best if best else 0.0
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options["model"])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        view_class = get_view_class(model)
+        fields_list = view_class.field_list[API_ACTION_LIST]
+        qs = model._default_manager.all()
+        if view_class.select_related:
+            qs = qs.select_related(*view_class.select_related)
+        objs = list(qs[: options["rows"]])
+        if not objs:
+            raise CommandError(f"There are no {model._meta.verbose_name_plural} to render")
+
+        engine = engines["django"]
+        legacy = self._measure(
+            lambda rows: [obj.get_row_data(fields_list) for obj in rows],
+            engine.from_string(LEGACY_TEMPLATE),
+            objs,
+            options["repeat"],
+        )
+        compiled = self._measure(
+            get_row_plan(model, tuple(fields_list)).get_rows,
+            engine.from_string(COMPILED_TEMPLATE),
+            objs,
+            options["repeat"],
+        )
+        self.stdout.write(f"{model._meta.label} x {len(objs)} rows, fields: {fields_list}")
+        self.stdout.write(f"get_row_data + per cell include: {legacy:,.0f} rows/s")
+        self.stdout.write(f"RowPlan + pre-rendered cells:    {compiled:,.0f} rows/s")
+        self.stdout.write(f"speedup: {compiled / legacy:.1f}x")
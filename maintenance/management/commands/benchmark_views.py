@@ -0,0 +1,248 @@
+import io
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+import warnings
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.db.models import Min
+from django.db.models.functions import Length
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from openpyxl import Workbook
+
+from maintenance.constants import (
+    API_ACTION_EDIT,
+    API_ACTION_EXPORT,
+    API_ACTION_HISTORY,
+    API_ACTION_HOME,
+    API_ACTION_IMPORT,
+    API_ACTION_LIST,
+    API_ACTION_READ,
+)
+from maintenance.management.commands.benchmark_rows import get_view_class
+from maintenance.models import Departamento, Distrito, Provincia
+from maintenance.ubigeo import invalidate_ubigeo_tree
+
+FIXTURES = ("departamentos", "provincias", "distritos")
+MODELS = (Departamento, Provincia, Distrito)
+MAX_COPIES = 99  # copies are prefixed with two digits, codigo has max_length 8
+
+
+class Command(BaseCommand):
+    help = (
+        "Latency, queries and memory of every action of the ubigeo maintenance views, "
+        "with the bundled fixtures optionally multiplied, as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="User allowed to run every action")
+        parser.add_argument(
+            "--multiply",
+            type=int,
+            default=1,
+            help=f"Times each ubigeo fixture row is present, up to {MAX_COPIES} (1893 distritos)",
+        )
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs of each request")
+        parser.add_argument("--search", default="SAN", help="Term of the list search case")
+        parser.add_argument("--import-rows", type=int, default=1000)
+        parser.add_argument("--skip-fixtures", action="store_true", help="Use the current rows")
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Commit the loaded rows, requests made by the benchmark are always rolled back",
+        )
+        parser.add_argument("--output", help="JSON file, printed when not given")
+
+    def handle(self, *args, **options):
+        if not 1 <= options["multiply"] <= MAX_COPIES:
+            raise CommandError(f"--multiply must be between 1 and {MAX_COPIES}")
+        try:
+            user = get_user_model()._default_manager.get_by_natural_key(options["username"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        client = Client()
+        client.force_login(user)
+        self.repeat = options["repeat"]
+        with transaction.atomic():
+            if not options["skip_fixtures"]:
+                with warnings.catch_warnings():  # fixture dates have no time zone
+                    warnings.filterwarnings("ignore", "DateTimeField", RuntimeWarning)
+                    call_command("loaddata", *FIXTURES, verbosity=0)
+            self.multiply(options["multiply"])
+            invalidate_ubigeo_tree()
+
+            savepoint = transaction.savepoint()
+            report = {
+                "date": timezone.now().isoformat(),
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                "database": "{} {}".format(
+                    connection.display_name, ".".join(map(str, connection.get_database_version()))
+                ),
+                "repeat": self.repeat,
+                "rows": {model._meta.label: model.todos.count() for model in MODELS},
+                "results": [
+                    result
+                    for model in MODELS
+                    for result in self.benchmark_view(client, model, options)
+                ],
+            }
+            transaction.savepoint_rollback(savepoint)
+            transaction.set_rollback(not options["keep"])
+        invalidate_ubigeo_tree()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+            for result in report["results"]:
+                self.stdout.write(
+                    "{view:<20} {action:<8} {case:<10} {status} {queries:>3} queries "
+                    "{latency_ms[median]:>9.1f} ms {memory_peak_kb:>9,.0f} KiB".format(**result)
+                )
+        else:
+            self.stdout.write(output)
+
+    def multiply(self, times: int) -> None:
+        """Copies of the fixture rows, codigo and parent codigo prefixed by the copy number."""
+        for model in MODELS:
+            attnames = [f.attname for f in model._meta.concrete_fields]
+            parent = next((f.attname for f in model._meta.concrete_fields if f.is_relation), None)
+            length = model.todos.aggregate(length=Min(Length("codigo")))["length"]
+            originals = list(
+                model.todos.annotate(length=Length("codigo"))
+                .filter(length=length)  # previous copies have longer codigos
+                .values(*attnames)
+            )
+            for copy in range(1, times):
+                prefix = f"{copy:02d}"
+                objs = list()
+                for values in originals:
+                    obj = model(**values)
+                    obj.codigo = f"{prefix}{obj.codigo}"
+                    obj.name = f"{obj.name} {prefix}"
+                    if parent:
+                        setattr(obj, parent, f"{prefix}{getattr(obj, parent)}")
+                    objs.append(obj)
+                model.todos.bulk_create(objs, batch_size=5000, ignore_conflicts=True)
+
+    def benchmark_view(self, client, model, options) -> list:
+        view_class = get_view_class(model)
+        namespace = f"{model._meta.app_label}:{model._meta.model_name}"
+        count = model.todos.count()
+        obj = model.todos.order_by("pk")[count // 2]
+        urls = {
+            action: reverse(f"{namespace}:{action}")
+            for action in (API_ACTION_HOME, API_ACTION_LIST, API_ACTION_EXPORT, API_ACTION_IMPORT)
+        }
+        urls.update(
+            {
+                action: reverse(f"{namespace}:{action}", args=(obj.pk,))
+                for action in (API_ACTION_READ, API_ACTION_EDIT, API_ACTION_HISTORY)
+            }
+        )
+        import_file, import_rows = self.get_import_file(model, options["import_rows"])
+
+        cases = [
+            (API_ACTION_HOME, "", "get", None),
+            (API_ACTION_LIST, "first", "get", None),
+            (API_ACTION_LIST, "search", "get", {"param": options["search"]}),
+            (API_ACTION_READ, "", "get", None),
+            (API_ACTION_EDIT, "form", "get", None),
+            (API_ACTION_EDIT, "save", "post", self.get_edit_data(view_class, obj)),
+            (API_ACTION_HISTORY, "", "get", None),
+            (API_ACTION_EXPORT, "xlsx", "get", None),
+            (API_ACTION_EXPORT, "csv", "get", {"format": "csv"}),
+            (
+                API_ACTION_IMPORT,
+                f"{import_rows} rows",
+                "post",
+                lambda: {"file": SimpleUploadedFile("import.xlsx", import_file)},
+            ),
+        ]
+        if not view_class.keyset_pagination:  # keyset pages are cursors, not numbers
+            last_page = max(1, -(-count // view_class.objects_per_page))
+            cases.insert(3, (API_ACTION_LIST, "last", "get", {"page": last_page}))
+
+        results = list()
+        for action, case, method, data in cases:
+            extra = dict() if action == API_ACTION_HOME else {"HTTP_HX_REQUEST": "true"}
+            result = self.measure(client, method, urls[action], data, **extra)
+            results.append({"view": view_class.__name__, "action": action, "case": case, **result})
+        return results
+
+    def get_edit_data(self, view_class, obj) -> dict:
+        form = view_class.edit_formclass(instance=obj)
+        return {name: value for name in form.fields if (value := form[name].value()) is not None}
+
+    def get_import_file(self, model, rows: int) -> tuple[bytes, int]:
+        """New rows with the columns of the model, referencing existing parents."""
+        fields = [f for f in model._meta.concrete_fields if f.editable and not f.primary_key]
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(["codigo"] + [f.attname for f in fields])
+        source = model.todos.order_by("pk").values_list(*[f.attname for f in fields])
+        i = 0
+        for i, values in enumerate(source[:rows], start=1):
+            sheet.append([f"B{i:07d}", *values])
+        file = io.BytesIO()
+        workbook.save(file)
+        return file.getvalue(), i
+
+    def request(self, client, method: str, path: str, data=None, **extra):
+        response = getattr(client, method)(path, data() if callable(data) else data, **extra)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def measure(self, client, method: str, path: str, data=None, **extra) -> dict:
+        """Every request runs in a savepoint rolled back afterwards, so all of them see the same
+        rows. The first one is a warm up, memory is traced apart not to slow the timed runs.
+        """
+
+        def run():
+            savepoint = transaction.savepoint()
+            try:
+                return self.request(client, method, path, data, **extra)
+            finally:
+                transaction.savepoint_rollback(savepoint)
+
+        reset_queries()  # the log is bounded, a full one would make the capture empty
+        with CaptureQueriesContext(connection) as queries:
+            response = run()
+        timings = list()
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings.sort()
+        return {
+            "method": method.upper(),
+            "path": path,
+            "status": response.status_code,
+            "queries": len(queries),
+            "latency_ms": {
+                "min": timings[0],
+                "median": statistics.median(timings),
+                "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+                "mean": statistics.fmean(timings),
+            },
+            "memory_peak_kb": peak / 1024,
+        }
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from maintenance.constants import JOB_CLEANUP_SECONDS, JOB_RETENTION_DAYS
+from maintenance.jobs import claim_job, delete_finished_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Worker running the import/export jobs queued by views with job_actions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+        parser.add_argument(
+            "--sleep", type=float, default=2.0, help="Seconds to wait while the queue is empty"
+        )
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=JOB_RETENTION_DAYS,
+            help="Days finished jobs and their files are kept, 0 keeps them forever",
+        )
+
+    def handle(self, *args, **options):
+        cleaned_at = None
+        while True:
+            close_old_connections()
+            job = claim_job()
+            if job is None:
+                now = time.monotonic()
+                if options["keep_days"] and (
+                    cleaned_at is None or now - cleaned_at > JOB_CLEANUP_SECONDS
+                ):
+                    cleaned_at = now
+                    if deleted := delete_finished_jobs(options["keep_days"]):
+                        self.stdout.write(f"Deleted {deleted} finished jobs")
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            self.stdout.write(f"Running job {job.pk}: {job}")
+            run_job(job)
+            self.stdout.write(f"Job {job.pk} {job.get_status_display().lower()}: {job.message}")
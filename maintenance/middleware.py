@@ -0,0 +1,69 @@
+import sentry_sdk
+
+from maintenance.instrumentation import ActionTiming, action_stats, wrap_connections
+from maintenance.views import MaintenanceAPIView
+
+
+class ActionInstrumentationMiddleware:
+    """Wall time, SQL queries and time, template time and size of every MaintenanceAPIView action.
+
+    Totals are aggregated per model and action in action_stats, HTMX requests get them in a
+    Server-Timing header and each action is a sentry span enclosing its database spans. Put it
+    first in MIDDLEWARE so the time of the rest of middlewares is included.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request.action_timing = ActionTiming()
+        try:
+            with wrap_connections(timing):
+                response = self.get_response(request)
+        finally:
+            if timing.span is not None:
+                timing.span.set_data("db.queries", timing.queries)
+                timing.span.set_data("db.time_ms", timing.sql_ms)
+                timing.span.set_data("template.time_ms", timing.template_ms)
+                timing.span.__exit__(None, None, None)
+
+        if timing.action is None:
+            return response
+        if request.headers.get("HX-Request"):
+            response["Server-Timing"] = timing.get_server_timing()
+
+        if not response.streaming:
+            action_stats.add(timing, len(response.content))
+        elif response.has_header("Content-Length") or response.is_async:
+            action_stats.add(timing, int(response.get("Content-Length", 0)))
+        else:  # recorded once the content is sent, streamed exports last until then
+            response.streaming_content = self.count_stream(timing, response.streaming_content)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        if view_class is None or not issubclass(view_class, MaintenanceAPIView):
+            return None
+
+        timing = request.action_timing
+        timing.model_name = view_class.model_name or view_class.model._meta.model_name
+        timing.action = request.resolver_match.url_name
+        timing.span = sentry_sdk.start_span(
+            op="maintenance.action", name=f"{timing.model_name}.{timing.action}"
+        )
+        timing.span.__enter__()  # closed by __call__ once the response is rendered
+        return None
+
+    def process_template_response(self, request, response):
+        if request.action_timing.action is not None:
+            request.action_timing.start_template(response)
+        return response
+
+    def count_stream(self, timing: ActionTiming, content):
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            action_stats.add(timing, size)
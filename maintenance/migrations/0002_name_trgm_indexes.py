@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:20
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("maintenance", "0001_initial")]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="departamento",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+                ),
+                name="departamento_name_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="distrito",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+                ),
+                name="distrito_name_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="provincia",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+                ),
+                name="provincia_name_trgm",
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("maintenance", "0002_name_trgm_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("view", models.CharField(max_length=250, verbose_name="Vista")),
+                ("action", models.CharField(max_length=20, verbose_name="Acción")),
+                ("params", models.JSONField(blank=True, default=dict, verbose_name="Parámetros")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pendiente"),
+                            ("running", "En proceso"),
+                            ("done", "Terminado"),
+                            ("failed", "Fallido"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Estado",
+                    ),
+                ),
+                ("progress", models.PositiveSmallIntegerField(default=0, verbose_name="Avance")),
+                ("message", models.TextField(blank=True, verbose_name="Mensaje")),
+                (
+                    "input_file",
+                    models.FileField(
+                        blank=True, upload_to="maintenance/jobs/", verbose_name="Archivo"
+                    ),
+                ),
+                (
+                    "result_file",
+                    models.FileField(
+                        blank=True, upload_to="maintenance/jobs/", verbose_name="Resultado"
+                    ),
+                ),
+                (
+                    "create_date",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación"),
+                ),
+                (
+                    "start_date",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Fecha de inicio"),
+                ),
+                (
+                    "end_date",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Fecha de fin"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuario",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tarea",
+                "verbose_name_plural": "Tareas",
+                "indexes": [models.Index(fields=["status", "id"], name="job_status_idx")],
+            },
+        )
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+from functools import partial
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.urls import reverse
 
 import pghistory
@@ -14,8 +19,15 @@ from maintenance.constants import (
     DATETIME_FORMAT,
     DPTO_CODIGO_CALLAO,
     DPTO_CODIGO_LIMA,
+    JOB_STATUS_CHOICES,
+    JOB_STATUS_DONE,
+    JOB_STATUS_FAILED,
+    JOB_STATUS_PENDING,
+    JOB_UPLOAD_TO,
 )
-from maintenance.utils import get_header_from_field
+from maintenance.ubigeo import DEPARTAMENTO, PROVINCIA, get_ubigeo_tree, invalidate_ubigeo_tree
+from maintenance.utils import get_header_from_field, get_object_url
+from maintenance.versions import bump_model_version
 
 
 class ManagerOnlyActive(models.Manager):
@@ -35,6 +47,15 @@ class BaseModel(models.Model):
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        self.normalize_fields()
+        super().save(*args, **kwargs)
+        transaction.on_commit(partial(bump_model_version, type(self)))
+
+    def normalize_fields(self):
+        """Hook to adjust field values before being persisted, also used by bulk imports."""
+        pass
+
     @classmethod
     def get_name(cls):
         return cls.__name__.lower()
@@ -51,47 +72,31 @@ class BaseModel(models.Model):
 class MaintenanceMixin:
     @property
     def edit_url(self):
-        return reverse(
-            f"{self._meta.app_label}:{self._meta.model_name}:{API_ACTION_EDIT}", args=(self.pk,)
-        )
+        return get_object_url(self, API_ACTION_EDIT)
 
     @property
     def delete_url(self):
-        return reverse(
-            f"{self._meta.app_label}:{self._meta.model_name}:{API_ACTION_DELETE}", args=(self.pk,)
-        )
+        return get_object_url(self, API_ACTION_DELETE)
 
     @property
     def reactivate_url(self):
-        return reverse(
-            f"{self._meta.app_label}:{self._meta.model_name}:{API_ACTION_REACTIVATE}",
-            args=(self.pk,),
-        )
+        return get_object_url(self, API_ACTION_REACTIVATE)
 
     @property
     def read_url(self):
-        return reverse(
-            f"{self._meta.app_label}:{self._meta.model_name}:{API_ACTION_READ}", args=(self.pk,)
-        )
+        return get_object_url(self, API_ACTION_READ)
 
     @property
     def reset_url(self):
-        return reverse(
-            f"{self._meta.app_label}:{self._meta.model_name}:{API_ACTION_RESET}", args=(self.pk,)
-        )
+        return get_object_url(self, API_ACTION_RESET)
 
     @property
     def history_url(self):
-        return reverse(
-            f"{self._meta.app_label}:{self._meta.model_name}:{API_ACTION_HISTORY}", args=(self.pk,)
-        )
+        return get_object_url(self, API_ACTION_HISTORY)
 
     @property
     def partial_plus_url(self):
-        return reverse(
-            f"{self._meta.app_label}:{self._meta.model_name}:{API_ACTION_PARTIAL_PLUS}",
-            args=(self.pk,),
-        )
+        return get_object_url(self, API_ACTION_PARTIAL_PLUS)
 
     @property
     def can_add_new_related(self):
@@ -125,7 +130,11 @@ class BaseCatalogo(BaseModel, MaintenanceMixin):
     todos = models.Manager()
 
     def __str__(self):
-        return f"{'' if self.is_active else self.DELETED_TEXT + ' - '}{self.name}"
+        return self.get_label(self.name, self.is_active)
+
+    @classmethod
+    def get_label(cls, name: str, is_active: bool) -> str:
+        return f"{'' if is_active else cls.DELETED_TEXT + ' - '}{name}"
 
     class Meta:
         abstract = True
@@ -143,9 +152,17 @@ class BaseCatalogo(BaseModel, MaintenanceMixin):
 class Departamento(BaseCatalogo):
     codigo = models.CharField(max_length=8, primary_key=True, verbose_name="Código")
 
+    class Meta:
+        indexes = [
+            GinIndex(OpClass(Upper("name"), name="gin_trgm_ops"), name="departamento_name_trgm")
+        ]
+
     def save(self, *args, **kwargs):
-        self.name = self.name.upper()
         super().save(*args, **kwargs)
+        transaction.on_commit(invalidate_ubigeo_tree)
+
+    def normalize_fields(self):
+        self.name = self.name.upper()
 
     @property
     def es_lima_o_callao(self):
@@ -157,20 +174,88 @@ class Provincia(BaseCatalogo):
     codigo = models.CharField(max_length=8, primary_key=True, verbose_name="Código")
     departamento = models.ForeignKey(Departamento, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            GinIndex(OpClass(Upper("name"), name="gin_trgm_ops"), name="provincia_name_trgm")
+        ]
+
     def save(self, *args, **kwargs):
-        self.name = self.name.upper()
         super().save(*args, **kwargs)
+        transaction.on_commit(invalidate_ubigeo_tree)
+
+    def normalize_fields(self):
+        self.name = self.name.upper()
 
 
 @pghistory.track()
 class Distrito(BaseCatalogo):
     codigo = models.CharField(max_length=8, primary_key=True, verbose_name="Código")
     provincia = models.ForeignKey(Provincia, on_delete=models.CASCADE)
+    departamento_header = "Departamento"
+
+    class Meta:
+        indexes = [GinIndex(OpClass(Upper("name"), name="gin_trgm_ops"), name="distrito_name_trgm")]
 
     def save(self, *args, **kwargs):
-        self.name = self.name.upper()
         super().save(*args, **kwargs)
+        transaction.on_commit(invalidate_ubigeo_tree)
+
+    def normalize_fields(self):
+        self.name = self.name.upper()
 
     @property
     def departamento_str(self):
-        return self.provincia.departamento
+        if Distrito.provincia.is_cached(self) and Provincia.departamento.is_cached(self.provincia):
+            return self.provincia.departamento  # select_related by the views
+        tree = get_ubigeo_tree()
+        return tree.get_label(DEPARTAMENTO, tree.get_parent(PROVINCIA, self.provincia_id))
+
+
+class Job(models.Model):
+    """Import or export executed by the run_jobs command instead of the request that asked it."""
+
+    view = models.CharField("Vista", max_length=250)
+    action = models.CharField("Acción", max_length=20)
+    params = models.JSONField("Parámetros", default=dict, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Usuario",
+    )
+    status = models.CharField(
+        "Estado", max_length=10, choices=JOB_STATUS_CHOICES, default=JOB_STATUS_PENDING
+    )
+    progress = models.PositiveSmallIntegerField("Avance", default=0)
+    message = models.TextField("Mensaje", blank=True)
+    input_file = models.FileField("Archivo", upload_to=JOB_UPLOAD_TO, blank=True)
+    result_file = models.FileField("Resultado", upload_to=JOB_UPLOAD_TO, blank=True)
+    create_date = models.DateTimeField("Fecha de creación", auto_now_add=True)
+    start_date = models.DateTimeField("Fecha de inicio", null=True, blank=True)
+    end_date = models.DateTimeField("Fecha de fin", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        indexes = [models.Index(fields=["status", "id"], name="job_status_idx")]
+
+    def __str__(self):
+        return f"{self.action} {self.view} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (JOB_STATUS_DONE, JOB_STATUS_FAILED)
+
+    @property
+    def success(self) -> bool:
+        return self.status == JOB_STATUS_DONE
+
+    @property
+    def status_url(self):
+        return reverse("maintenance:job", args=(self.pk,))
+
+    @property
+    def result_url(self):
+        return reverse("maintenance:job-result", args=(self.pk,))
@@ -0,0 +1,234 @@
+import base64
+import datetime
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.core.paginator import Page, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model, Q, QuerySet
+from django.utils.functional import cached_property
+
+from asgiref.sync import sync_to_async
+
+from maintenance.versions import get_model_versions
+
+CURSOR_NEXT = "n"
+CURSOR_PREVIOUS = "p"
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder keeping microseconds, a cursor has to match the stored value exactly."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator whose COUNT(*) is kept in the cache for count_cache_timeout seconds, or until
+    the table version changes.
+    """
+
+    def __init__(self, *args, count_cache_timeout: int | None = None, **kwargs):
+        self.count_cache_timeout = count_cache_timeout
+        super().__init__(*args, **kwargs)
+
+    def _get_count_cache_key(self) -> str | None:
+        if not self.count_cache_timeout or not isinstance(self.object_list, QuerySet):
+            return None
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        model = self.object_list.model
+        fingerprint = (sql, params, get_model_versions(model))  # new after every write
+        digest = hashlib.md5(repr(fingerprint).encode(), usedforsecurity=False).hexdigest()
+        return f"maintenance:count:{model._meta.label_lower}:{digest}"
+
+    @cached_property
+    def count(self):
+        if not (key := self._get_count_cache_key()):
+            return super().count
+
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    async def acount(self) -> int:
+        if not isinstance(self.object_list, QuerySet):
+            return self.count
+        if not (key := await sync_to_async(self._get_count_cache_key)()):
+            return await self.object_list.acount()
+
+        count = await cache.aget(key)
+        if count is None:
+            count = await self.object_list.acount()
+            await cache.aset(key, count, self.count_cache_timeout)
+        return count
+
+    async def aget_page(self, number) -> Page:
+        """get_page for async views, the page rows are fetched with async iteration."""
+        self.count = await self.acount()
+        page = self.get_page(number)
+        if isinstance(page.object_list, QuerySet):
+            page.object_list = [obj async for obj in page.object_list]
+        return page
+
+
+class KeysetPage:
+    """Page of a KeysetPaginator, exposing the same interface used by pagination.html.
+
+    next_page_number and previous_page_number return cursors instead of numbers, so the
+    template keeps sending them through the "page" querystring parameter.
+    """
+
+    def __init__(
+        self, object_list: list, number: int, paginator, has_next: bool, has_previous: bool
+    ):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self) -> str:
+        return self.paginator.encode_cursor(CURSOR_NEXT, self.number + 1, self.object_list[-1])
+
+    def previous_page_number(self) -> str:
+        return self.paginator.encode_cursor(CURSOR_PREVIOUS, self.number - 1, self.object_list[0])
+
+
+class KeysetPaginator:
+    """Cursor based paginator: no COUNT(*) and no OFFSET, deep pages cost the same as the first.
+
+    The queryset ordering (e.g. ("-is_active", "codigo")) is completed with the primary key to
+    get a total order, and each cursor holds the ordering values of the row where it starts.
+    NULLs are compared as PostgreSQL sorts them, greater than any other value.
+    """
+
+    def __init__(self, object_list: QuerySet, per_page: int):
+        ordering = list(object_list.query.order_by) or []
+        if not any(o.lstrip("-") in ("pk", object_list.model._meta.pk.name) for o in ordering):
+            ordering.append("pk")
+        self.object_list = object_list.order_by(*ordering)
+        self.per_page = int(per_page)
+        self.ordering = [(o.lstrip("-"), o.startswith("-")) for o in ordering]
+        self.nullable = [self._is_nullable(object_list.model, field) for field, _ in self.ordering]
+        self._pages = dict()
+
+    @staticmethod
+    def _is_nullable(model, field_path: str) -> bool:
+        """Whether the ordering field can be NULL, itself or through a nullable relation."""
+        for name in field_path.split("__"):
+            if name == "pk":
+                return False
+            try:
+                field = model._meta.get_field(name)
+            except (AttributeError, FieldDoesNotExist):  # annotations and transforms
+                return True
+            if field.null:
+                return True
+            model = field.related_model
+        return False
+
+    @staticmethod
+    def _get_value(obj: Model, field_path: str):
+        value = obj
+        for attr in field_path.split("__"):
+            value = getattr(value, attr, None)
+        return value.pk if isinstance(value, Model) else value
+
+    def encode_cursor(self, direction: str, number: int, obj: Model) -> str:
+        values = [self._get_value(obj, field) for field, _ in self.ordering]
+        data = json.dumps([direction, number, values], cls=CursorJSONEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor) -> tuple[str, int, list] | None:
+        try:
+            direction, number, values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+            number = int(number)
+        except (ValueError, TypeError):
+            return None
+        if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or not isinstance(values, list):
+            return None
+        return direction, number, values
+
+    @staticmethod
+    def _get_equal(field: str, value) -> Q:
+        return Q(**{f"{field}__isnull": True}) if value is None else Q(**{field: value})
+
+    @staticmethod
+    def _get_beyond(field: str, value, greater: bool, nullable: bool) -> Q:
+        if value is None:  # nothing is greater than NULL, everything else is less
+            return Q(pk__in=[]) if greater else Q(**{f"{field}__isnull": False})
+        if not greater:
+            return Q(**{f"{field}__lt": value})
+        condition = Q(**{f"{field}__gt": value})
+        return condition | Q(**{f"{field}__isnull": True}) if nullable else condition
+
+    def _get_keyset_filter(self, values: list, forward: bool) -> Q:
+        keyset_filter = Q()
+        for i, (field, descending) in enumerate(self.ordering):
+            condition = self._get_beyond(field, values[i], descending != forward, self.nullable[i])
+            for j, (previous_field, _) in enumerate(self.ordering[:i]):
+                condition &= self._get_equal(previous_field, values[j])
+            keyset_filter |= condition
+        return keyset_filter
+
+    def _get_page_queryset(self, cursor) -> tuple[QuerySet, str | None, int]:
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None or len(decoded[2]) != len(self.ordering):
+            return self.object_list[: self.per_page + 1], None, 1
+
+        direction, number, values = decoded
+        if direction == CURSOR_NEXT:
+            qs = self.object_list.filter(self._get_keyset_filter(values, forward=True))
+        else:
+            qs = self.object_list.filter(self._get_keyset_filter(values, forward=False)).reverse()
+        return qs[: self.per_page + 1], direction, max(number, 1)
+
+    def _get_page(self, objs: list, direction: str | None, number: int) -> KeysetPage:
+        has_more = len(objs) > self.per_page
+        objs = objs[: self.per_page]
+        if direction is None:
+            return KeysetPage(objs, 1, self, has_more, False)
+        elif direction == CURSOR_NEXT:
+            return KeysetPage(objs, number, self, has_more, number > 1 and bool(objs))
+        return KeysetPage(objs[::-1], number, self, bool(objs), has_more)
+
+    def get_page(self, cursor=None) -> KeysetPage:
+        if cursor not in self._pages:
+            qs, direction, number = self._get_page_queryset(cursor)
+            self._pages[cursor] = self._get_page(list(qs), direction, number)
+        return self._pages[cursor]
+
+    async def aget_page(self, cursor=None) -> KeysetPage:
+        if cursor not in self._pages:
+            qs, direction, number = self._get_page_queryset(cursor)
+            self._pages[cursor] = self._get_page([obj async for obj in qs], direction, number)
+        return self._pages[cursor]
+
+    def get_elided_page_range(self, cursor=None) -> list:
+        """Only the current page can be numbered without counting rows."""
+        return [self.get_page(cursor).number]
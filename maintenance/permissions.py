@@ -0,0 +1,101 @@
+from collections.abc import Callable, Mapping
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+PERMISSIONS_CACHE_PREFIX = "maintenance:perms"
+
+
+def _get_version_key(user=None) -> str:
+    return f"{PERMISSIONS_CACHE_PREFIX}:version" + ("" if user is None else f":{user.pk}")
+
+
+def get_permissions_cache_key(user, *parts) -> str:
+    """Cache key of a permission map.
+
+    It changes whenever the role of the user changes and with every invalidate_permissions().
+    """
+    global_key, user_key = _get_version_key(), _get_version_key(user)
+    versions = cache.get_many((global_key, user_key))
+    version = f"{versions.get(global_key, 0)}.{versions.get(user_key, 0)}"
+    role = getattr(user, "role_id", None)
+    return ":".join(str(p) for p in (PERMISSIONS_CACHE_PREFIX, user.pk, role, version, *parts))
+
+
+def invalidate_permissions(user=None) -> None:
+    """Drop every cached permission map of the user, or of every user when None is given."""
+    key = _get_version_key(user)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _invalidate_permissions(sender, instance, action="post_save", **kwargs):
+    if not action.startswith("post_"):  # m2m_changed is sent before and after each change
+        return
+    user = instance if isinstance(instance, get_user_model()) else None
+    transaction.on_commit(partial(invalidate_permissions, user))
+
+
+def connect_permissions_models() -> None:
+    """Invalidate the cached permissions when a model of MAINTENANCE_PERMISSIONS_MODELS changes.
+
+    A change of a user only invalidates its own permissions, any other model (roles, their
+    permissions...) invalidates every user. Their many to many relations are followed too.
+    """
+    for label in getattr(settings, "MAINTENANCE_PERMISSIONS_MODELS", ()):
+        model = apps.get_model(label)
+        uid = f"maintenance.permissions:{label}"
+        post_save.connect(_invalidate_permissions, sender=model, dispatch_uid=uid)
+        post_delete.connect(_invalidate_permissions, sender=model, dispatch_uid=uid)
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(
+                _invalidate_permissions,
+                sender=field.remote_field.through,
+                dispatch_uid=f"{uid}.{field.name}",
+            )
+
+
+class PermissionMap(Mapping):
+    """Lazy action -> bool mapping, each permission is evaluated the first time it is read.
+
+    Actions outside the allowed ones are never permitted. When a cache_key is given, the
+    evaluated permissions are shared between requests through the default cache.
+    """
+
+    def __init__(
+        self,
+        actions,
+        evaluate: Callable[[str], bool],
+        cache_key: str | None = None,
+        timeout: int | None = None,
+    ):
+        self._actions = frozenset(actions)
+        self._evaluate = evaluate
+        self._cache_key = cache_key
+        self._timeout = timeout
+        self._values = (cache.get(cache_key) or {}) if cache_key else {}
+
+    def __getitem__(self, action: str) -> bool:
+        if action not in self._actions:
+            return False
+        if action not in self._values:
+            self._values[action] = bool(self._evaluate(action))
+            if self._cache_key:
+                cache.set(self._cache_key, self._values, self._timeout)
+        return self._values[action]
+
+    def __iter__(self):
+        return iter(self._actions)
+
+    def __len__(self):
+        return len(self._actions)
+
+    def __contains__(self, action) -> bool:
+        return action in self._actions
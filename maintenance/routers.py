@@ -0,0 +1,25 @@
+from django.urls import path
+
+from maintenance.constants import API_ACTION_HOME
+
+
+def get_action_route(view_class, action: str) -> str:
+    route = "" if action == API_ACTION_HOME else f"{action}/"
+    if action in view_class.actions_with_object:
+        route = f"{route}<str:object_pk>/"
+    if view_class.is_related:
+        route = f"<str:parent_pk>/{route}"
+    return route
+
+
+def get_urlpatterns(view_class, **initkwargs) -> list:
+    """path() of every action of view_class, named after the action and passing it as kwarg.
+
+    The view reads its action from the kwarg instead of parsing the request path, so routes
+    can be included under any prefix. One view function serves all of them.
+    """
+    view = view_class.as_view(**initkwargs)
+    return [
+        path(get_action_route(view_class, action), view, {"action": action}, name=action)
+        for action in view_class.get_url_actions()
+    ]
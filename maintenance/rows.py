@@ -0,0 +1,143 @@
+from datetime import datetime
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Concat
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from maintenance.utils import format_to_str
+
+CELL_BOOL = "bool"
+CELL_DATE = "date"
+CELL_FK = "fk"
+CELL_TEXT = "text"
+
+
+@lru_cache
+def get_bool_html(value: bool) -> str:
+    """The true-false icon partial only depends on the value, render it once per value."""
+    context = {"value": str(value)}
+    return mark_safe(
+        render_to_string("maintenance/components/icons.html#true-false", context).strip()
+    )
+
+
+class Cell:
+    __slots__ = ("value", "type", "html")
+
+    def __init__(self, value, cell_type: str):
+        self.value = value
+        self.type = cell_type
+        if cell_type == CELL_BOOL:
+            self.html = get_bool_html(bool(value))
+        else:
+            if isinstance(value, datetime) and timezone.is_aware(value):
+                value = timezone.localtime(value)
+            self.html = conditional_escape(format_to_str(value))
+
+    def __str__(self):
+        return self.html
+
+
+def get_label_expression(path: str, deleted_text: str) -> Case:
+    """BaseCatalogo.get_label computed by the database for the catalogue at path."""
+    return Case(
+        When(
+            **{f"{path}__is_active": False},
+            then=Concat(Value(f"{deleted_text} - "), f"{path}__name"),
+        ),
+        default=F(f"{path}__name"),
+        output_field=models.CharField(),
+    )
+
+
+class ProjectedObject:
+    """Stand-in of a model instance holding projected values instead of the whole row.
+
+    Properties of the model (edit_url, <field>_str...) are evaluated against it, so they can
+    only rely on the projected values. The <field>_str of a field in labels is its projected
+    value, the database already computed the text displayed.
+    """
+
+    def __init__(self, model, values: dict, labels=frozenset()):
+        self._model = model
+        self._meta = model._meta
+        self._labels = labels
+        self.__dict__.update(values)
+
+    def __getattr__(self, name):
+        field_name = name.removesuffix("_str")
+        if field_name != name and field_name in self._labels:
+            return self.__dict__[field_name]
+        attr = getattr(self._model, name, None)
+        if isinstance(attr, property):
+            return attr.fget(self)
+        raise AttributeError(name)
+
+
+class Row:
+    __slots__ = ("object", "data")
+
+    def __init__(self, obj, data: list):
+        self.object = obj
+        self.data = data
+
+
+class RowPlan:
+    """Column accessors for a model and a field_list, resolved once instead of per cell.
+
+    A "<field>_str" attribute on the model takes precedence over the field itself, as in
+    MaintenanceMixin.get_row_data.
+    """
+
+    def __init__(self, model, fields_list: tuple):
+        self.columns = [self._get_column(model, field_name) for field_name in fields_list]
+
+    @staticmethod
+    def _get_column(model, field_name: str) -> tuple:
+        attrs = (f"{field_name}_str", field_name) if hasattr(model, f"{field_name}_str") else ()
+        try:
+            field = model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            field = None
+
+        if isinstance(field, models.BooleanField):
+            cell_type = CELL_BOOL
+        elif isinstance(field, (models.DateTimeField, models.DateField, models.TimeField)):
+            cell_type = CELL_DATE
+        elif isinstance(field, models.ForeignKey):
+            cell_type = CELL_FK
+        else:
+            cell_type = CELL_TEXT
+        return attrs or (field_name,), cell_type
+
+    def get_row(self, obj) -> Row:
+        data = list()
+        for attrs, cell_type in self.columns:
+            value = None
+            for attr in attrs:
+                value = getattr(obj, attr, None)
+                if value:
+                    break
+            data.append(Cell(value, cell_type))
+        return Row(obj, data)
+
+    def get_rows(self, object_list) -> list:
+        return [self.get_row(obj) for obj in object_list]
+
+    def get_projected_rows(self, model, names: list, values_list, labels=frozenset()) -> list:
+        """Rows from values_list tuples named by names, no model instance is created."""
+        return [
+            self.get_row(ProjectedObject(model, dict(zip(names, values)), labels))
+            for values in values_list
+        ]
+
+
+@lru_cache
+def get_row_plan(model, fields_list: tuple) -> RowPlan:
+    return RowPlan(model, fields_list)
@@ -0,0 +1,77 @@
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import Q, QuerySet
+from django.db.models.functions import Upper
+
+
+class ContainsSearchBackend:
+    """Substring search over fields plus prefix search over prefix_fields.
+
+    On PostgreSQL icontains is compiled to UPPER(field) LIKE UPPER('%param%'), which is served
+    by a GIN index over OpClass(Upper(field), name="gin_trgm_ops") like the ubigeo ones.
+    Prefix lookups are served by the varchar_pattern_ops index Django adds to char keys.
+    """
+
+    lookup = "icontains"
+
+    def __init__(self, fields: tuple = ("name",), prefix_fields: tuple = ()):
+        self.fields = fields
+        self.prefix_fields = prefix_fields
+
+    def get_filters(self, param: str) -> list:
+        filters = [Q(**{f"{field}__{self.lookup}": param}) for field in self.fields]
+        filters += [Q(**{f"{field}__startswith": param}) for field in self.prefix_fields]
+        return filters
+
+    def filter(self, qs: QuerySet, param: str) -> QuerySet:
+        filters = self.get_filters(param)
+        return qs.filter(reduce(or_, filters)) if filters else qs
+
+
+class TrigramSearchBackend(ContainsSearchBackend):
+    """Typo tolerant search, needs django.contrib.postgres in INSTALLED_APPS and pg_trgm.
+
+    Similarity is computed over Upper(field) so the same GIN index serves both lookups.
+    """
+
+    def get_filters(self, param: str) -> list:
+        filters = super().get_filters(param)
+        filters += [
+            Q(**{f"{field}_upper__trigram_similar": param.upper()}) for field in self.fields
+        ]
+        return filters
+
+    def filter(self, qs: QuerySet, param: str) -> QuerySet:
+        qs = qs.alias(**{f"{field}_upper": Upper(field) for field in self.fields})
+        return super().filter(qs, param)
+
+
+class FullTextSearchBackend(ContainsSearchBackend):
+    """Full text search over a stored SearchVectorField, or over fields computed on the fly."""
+
+    def __init__(
+        self,
+        fields: tuple = ("name",),
+        prefix_fields: tuple = (),
+        vector_field: str = "",
+        config: str = "simple",
+    ):
+        super().__init__(fields, prefix_fields)
+        self.vector_field = vector_field
+        self.config = config
+
+    def get_filters(self, param: str) -> list:
+        query = SearchQuery(param, config=self.config)
+        filters = [Q(**{f"{field}__startswith": param}) for field in self.prefix_fields]
+        if self.vector_field:
+            filters.append(Q(**{self.vector_field: query}))
+        else:
+            filters.append(Q(_search_vector=query))
+        return filters
+
+    def filter(self, qs: QuerySet, param: str) -> QuerySet:
+        if not self.vector_field:
+            qs = qs.annotate(_search_vector=SearchVector(*self.fields, config=self.config))
+        return super().filter(qs, param)
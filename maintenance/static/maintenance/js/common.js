@@ -97,6 +97,48 @@ function seekAndShow(el, val, dst, def = "") {
   }
 }
 
+const ubigeoDatasets = {};
+
+function getUbigeoChildren(url) {
+  // {level: {parent codigo: [[codigo, label], ...]}}, fetched once per version
+  if (!ubigeoDatasets[url]) {
+    ubigeoDatasets[url] = fetch(url, {credentials: "same-origin"})
+      .then(response => response.json())
+      .then(data => {
+        const children = {};
+        ["provincia", "distrito"].forEach(level => {
+          children[level] = {};
+          data[level].forEach(([codigo, label, parent]) => {
+            (children[level][parent] ||= []).push([codigo, label]);
+          })
+        })
+        return children;
+      })
+  }
+  return ubigeoDatasets[url];
+}
+
+function loadUbigeoSelects() {
+  document.querySelectorAll("select[data-ubigeo-parent]:not([data-ubigeo-loaded])").forEach(e => {
+    const parent = e.closest("form")?.elements[e.dataset.ubigeoParent];
+    if (!parent) {
+      return;
+    }
+    e.dataset.ubigeoLoaded = "true";
+    parent.addEventListener("change", () => {
+      getUbigeoChildren(e.dataset.ubigeoUrl).then(children => {
+        const empty = e.querySelector("option[value='']");
+        e.replaceChildren(...(empty ? [empty] : []));
+        (children[e.dataset.ubigeoLevel][parent.value] || []).forEach(([codigo, label]) => {
+          e.add(new Option(label, codigo));
+        })
+        e.value = "";
+        e.dispatchEvent(new Event("change"));
+      })
+    })
+  })
+}
+
 const swalWarning = Swal.mixin({
   customClass: {
     confirmButton: 'btn btn-danger ms-md-5',
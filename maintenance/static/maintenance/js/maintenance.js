@@ -2,6 +2,7 @@ const modalForm = new bootstrap.Modal(document.getElementById('modal-form'));
 
 document.addEventListener("DOMContentLoaded", function () {
   loadDatePicker();
+  loadUbigeoSelects();
 });
 
 htmx.on("htmx:afterSwap", (e) => {
@@ -10,6 +11,7 @@ htmx.on("htmx:afterSwap", (e) => {
   loadInputmask();
   loadDeletes();
   loadReactivates();
+  loadUbigeoSelects();
 
   if (e.detail.target.id === "modal-form-dialog") {
     modalForm.show();
@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import URLResolver, get_resolver, reverse
+
+from maintenance.views import AsyncMaintenanceAPIView, MaintenanceAPIView
+
+
+def iter_maintenance_urls(patterns=None, namespace: str = ""):
+    """(url name, view class, route parameters) of every routed MaintenanceAPIView action."""
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace
+            yield from iter_maintenance_urls(pattern.url_patterns, prefix)
+            continue
+        view_class = getattr(pattern.callback, "view_class", None)
+        if view_class and issubclass(view_class, MaintenanceAPIView) and pattern.name:
+            yield f"{namespace}{pattern.name}", view_class, set(pattern.pattern.converters)
+
+
+class QueryBudgetTestMixin:
+    """Request every action with a query_budget of every routed MaintenanceAPIView.
+
+    Each request runs with MAINTENANCE_QUERY_BUDGET enabled and is rolled back, so an action
+    over its budget fails with its SQL. The TestCase provides the rows, e.g. through fixtures,
+    and the user allowed to run every action. AsyncMaintenanceAPIView subclasses are skipped,
+    their queries run in other threads.
+    """
+
+    def get_query_budget_user(self):
+        """User allowed to run every action, to be provided by the TestCase."""
+        raise NotImplementedError(
+            f"{type(self).__name__} must implement get_query_budget_user() to return the user "
+            "the actions are requested with"
+        )
+
+    def get_query_budget_data(self, view_class, action: str, obj) -> dict:
+        """POST data of the action, the initial values of the edit form by default."""
+        if obj is None or view_class.edit_formclass is None:
+            return dict()
+        form = view_class.edit_formclass(instance=obj)
+        return {name: value for name in form.fields if (value := form[name].value()) is not None}
+
+    def get_query_budget_kwargs(self, view_class, params: set, obj) -> dict | None:
+        kwargs = dict()
+        if "parent_pk" in params:
+            parent_name = view_class.parent_model._meta.model_name
+            if obj is not None:
+                kwargs["parent_pk"] = obj.serializable_value(parent_name)
+            elif parent := view_class.parent_model.todos.order_by("pk").first():
+                kwargs["parent_pk"] = parent.pk
+            else:
+                return None
+        if "object_pk" in params:
+            if obj is None:
+                return None
+            kwargs["object_pk"] = obj.pk
+        return kwargs
+
+    @override_settings(MAINTENANCE_QUERY_BUDGET=True)
+    def test_query_budgets(self):
+        self.client.force_login(self.get_query_budget_user())
+        for name, view_class, params in iter_maintenance_urls():
+            action = name.rpartition(":")[2]
+            if action not in view_class.query_budget or issubclass(
+                view_class, AsyncMaintenanceAPIView
+            ):
+                continue
+            obj = view_class.model.todos.order_by("pk").first()
+            kwargs = self.get_query_budget_kwargs(view_class, params, obj)
+            methods = [
+                method
+                for method, actions in (
+                    ("get", view_class.actions_get),
+                    ("post", view_class.actions_post),
+                    ("delete", view_class.actions_delete),
+                )
+                if action in actions
+            ]
+            for method in methods:
+                with self.subTest(view=view_class.__name__, action=action, method=method):
+                    if kwargs is None:
+                        self.skipTest(f"There are no {view_class.model._meta.verbose_name_plural}")
+                    url = reverse(name, kwargs=kwargs)
+                    with transaction.atomic():
+                        if method == "post":
+                            data = self.get_query_budget_data(view_class, action, obj)
+                            response = self.client.post(url, data)
+                        else:
+                            response = getattr(self.client, method)(url)
+                        transaction.set_rollback(True)
+                    self.assertLess(response.status_code, 500)
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from functools import cached_property
+
+from django.apps import apps
+
+from maintenance.constants import UBIGEO_TREE_CHECK_SECONDS
+
+DEPARTAMENTO = "departamento"
+PROVINCIA = "provincia"
+DISTRITO = "distrito"
+UBIGEO_PARENTS = {DEPARTAMENTO: None, PROVINCIA: DEPARTAMENTO, DISTRITO: PROVINCIA}
+
+
+class UbigeoTree:
+    """Read only Departamento -> Provincia -> Distrito tree kept in memory.
+
+    Every node is stored as a (label, is_active, parent codigo) tuple keyed by codigo, and the
+    children of each node as a tuple of codigos sorted by codigo.
+    """
+
+    def __init__(self, nodes: dict, version: tuple):
+        self.nodes = nodes  # {level: {codigo: (label, is_active, parent)}}
+        self.version = version
+        self.children = {level: dict() for level in UBIGEO_PARENTS}
+        for level, parent_level in UBIGEO_PARENTS.items():
+            if parent_level is None:
+                continue
+            children = dict()
+            for codigo, (_, _, parent) in sorted(nodes[level].items()):
+                children.setdefault(parent, list()).append(codigo)
+            self.children[parent_level] = {k: tuple(v) for k, v in children.items()}
+
+    @classmethod
+    def build(cls):
+        nodes = dict()
+        version = get_ubigeo_version()
+        for level, parent_level in UBIGEO_PARENTS.items():
+            model = apps.get_model("maintenance", level)
+            fields = ("codigo", "name", "is_active") + (
+                (f"{parent_level}_id",) if parent_level else ()
+            )
+            nodes[level] = {
+                row[0]: (model.get_label(row[1], row[2]), row[2], row[3] if parent_level else None)
+                for row in model.todos.values_list(*fields)
+            }
+        return cls(nodes, version)
+
+    @cached_property
+    def etag(self) -> str:
+        return "-".join(str(pgh_id or 0) for pgh_id in self.version)
+
+    @cached_property
+    def json(self) -> bytes:
+        """Active nodes of every level as [codigo, label, parent codigo], built once per tree."""
+        data = {"version": self.etag}
+        for level, parent_level in UBIGEO_PARENTS.items():
+            data[level] = [
+                [codigo, label, parent] if parent_level else [codigo, label]
+                for codigo, (label, is_active, parent) in sorted(self.nodes[level].items())
+                if is_active
+            ]
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def get_label(self, level: str, codigo: str) -> str:
+        node = self.nodes[level].get(codigo)
+        return node[0] if node else ""
+
+    def get_parent(self, level: str, codigo: str) -> str | None:
+        node = self.nodes[level].get(codigo)
+        return node[2] if node else None
+
+    def get_choices(self, level: str, parent: str | None = None) -> list:
+        """Active (codigo, label) children of parent, or every active node of a top level."""
+        nodes = self.nodes[level]
+        codigos = self.children[UBIGEO_PARENTS[level]].get(parent, ()) if parent else sorted(nodes)
+        return [(c, nodes[c][0]) for c in codigos if nodes[c][1]]
+
+
+_tree = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_ubigeo_version() -> tuple:
+    """Latest pghistory event of each ubigeo model, it changes with every tracked write."""
+    version = list()
+    for level in UBIGEO_PARENTS:
+        event_model = apps.get_model("maintenance", f"{level}event")
+        version.append(
+            event_model.objects.order_by("-pgh_id").values_list("pgh_id", flat=True).first()
+        )
+    return tuple(version)
+
+
+def get_ubigeo_tree() -> UbigeoTree:
+    """Build the tree on first use and rebuild it when this process or any other writes ubigeo.
+
+    Writes made through this process invalidate it at once, writes made elsewhere (other
+    workers, bulk imports, the shell) are noticed through the pghistory events at most every
+    UBIGEO_TREE_CHECK_SECONDS seconds.
+    """
+    global _tree, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if _tree is not None and now - _checked_at > UBIGEO_TREE_CHECK_SECONDS:
+            _checked_at = now
+            if get_ubigeo_version() != _tree.version:
+                _tree = None
+        if _tree is None:
+            _tree = UbigeoTree.build()
+            _checked_at = now
+        return _tree
+
+
+def invalidate_ubigeo_tree() -> None:
+    global _tree
+    with _lock:
+        _tree = None
@@ -1,9 +1,15 @@
 from django.urls import include, path
 
+from maintenance.views import ActionStatsView, JobAPIView, UbigeoAPIView
+
 app_name = "maintenance"
 
 urlpatterns = [
     path("departamento/", include("maintenance.urls.departamento", namespace="departamento")),
     path("provincia/", include("maintenance.urls.provincia", namespace="provincia")),
     path("distrito/", include("maintenance.urls.distrito", namespace="distrito")),
+    path("job/<int:job_id>/", JobAPIView.as_view(), name="job"),
+    path("job/<int:job_id>/result/", JobAPIView.as_view(), {"result": True}, name="job-result"),
+    path("stats/", ActionStatsView.as_view(), name="stats"),
+    path("ubigeo/", UbigeoAPIView.as_view(), name="ubigeo"),
 ]
@@ -1,4 +1,8 @@
 from datetime import date, datetime, time
+from urllib.parse import quote
+
+from django.urls import NoReverseMatch, reverse
+from django.utils.http import RFC3986_SUBDELIMS
 
 from maintenance.constants import (
     DATE_FORMAT,
@@ -10,8 +14,12 @@ from maintenance.constants import (
     TODOS,
     TODOS_STR,
     TRUE_STR,
+    URL_PK_PLACEHOLDERS,
 )
 
+_url_templates = dict()
+_action_urls = dict()
+
 
 def complete_todos_choices(choices: tuple, at_the_end: bool = True) -> tuple:
     todos_tuple = ((TODOS, TODOS_STR),)
@@ -53,3 +61,47 @@ def get_header_from_field(instance, field_name: str) -> str:
     if header is None:
         header = get_verbose_name(instance, field_name)
     return header
+
+
+def get_view_url_template(view_name: str) -> tuple[str, str]:
+    """Resolve view_name with a pk argument once and keep the url around the pk."""
+    if view_name not in _url_templates:
+        for placeholder in URL_PK_PLACEHOLDERS:  # the second one matches <int:...> converters
+            try:
+                url = reverse(view_name, args=(placeholder,))
+            except NoReverseMatch:
+                continue
+            prefix, _, suffix = url.rpartition(placeholder)
+            _url_templates[view_name] = (prefix, suffix)
+            break
+        else:
+            raise NoReverseMatch(f"Reverse for '{view_name}' with a pk argument not found.")
+    return _url_templates[view_name]
+
+
+def get_pk_url(view_name: str, pk) -> str:
+    prefix, suffix = get_view_url_template(view_name)
+    return f"{prefix}{quote(str(pk), safe=RFC3986_SUBDELIMS + '~:@')}{suffix}"
+
+
+def get_object_url(instance, action: str) -> str:
+    return get_pk_url(
+        f"{instance._meta.app_label}:{instance._meta.model_name}:{action}", instance.pk
+    )
+
+
+def get_action_url(view_name: str) -> str:
+    """reverse() of an action without arguments, resolved once, missing urls included."""
+    if view_name not in _action_urls:
+        try:
+            _action_urls[view_name] = reverse(view_name)
+        except NoReverseMatch:
+            _action_urls[view_name] = None
+    if (url := _action_urls[view_name]) is None:
+        raise NoReverseMatch(f"Reverse for '{view_name}' not found.")
+    return url
+
+
+def clear_url_templates() -> None:
+    _url_templates.clear()
+    _action_urls.clear()
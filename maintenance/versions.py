@@ -0,0 +1,31 @@
+import time
+
+from django.core.cache import cache
+
+VERSION_CACHE_PREFIX = "maintenance:version"
+
+
+def _get_version_key(model) -> str:
+    return f"{VERSION_CACHE_PREFIX}:{model._meta.label_lower}"
+
+
+def get_model_versions(*models) -> tuple:
+    """Current version of each model table, bumped on every write made through the models.
+
+    Versions start from the current time, so a flushed cache never hands out old values.
+    """
+    keys = [_get_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    if missing := [key for key in keys if key not in versions]:
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        versions.update(cache.get_many(missing))
+    return tuple(versions.get(key) for key in keys)
+
+
+def bump_model_version(model) -> None:
+    key = _get_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
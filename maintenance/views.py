@@ -1,22 +1,38 @@
+import hashlib
 import json
 import logging
+import os
+import tempfile
+from contextlib import nullcontext
+from functools import partial
 
+from django.conf import settings
 from django.contrib.auth.views import LoginView, LogoutView
-from django.core.exceptions import ValidationError
-from django.core.paginator import Paginator
-from django.db import IntegrityError
-from django.db.models import QuerySet
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, QuerySet, Value
 from django.http import (
+    FileResponse,
+    HttpRequest,
     HttpResponse,
     HttpResponseBadRequest,
     HttpResponseForbidden,
     HttpResponseNotFound,
+    HttpResponseNotModified,
+    JsonResponse,
+    QueryDict,
+    StreamingHttpResponse,
 )
-from django.urls import reverse
+from django.shortcuts import get_object_or_404, render
+from django.template.response import SimpleTemplateResponse
 from django.utils import timezone
+from django.utils.http import content_disposition_header, parse_etags, quote_etag
+from django.views import View
 from django.views.generic import TemplateView
 
-from tablib import Dataset
+from asgiref.sync import sync_to_async
 
 from maintenance.constants import (
     API_ACTION_ADD,
@@ -34,12 +50,27 @@ from maintenance.constants import (
     API_ACTION_REACTIVATE,
     API_ACTION_READ,
     API_ACTION_RESET,
-    CONTENT_TYPE_XLSX,
+    CONTENT_TYPE_CSV,
+    EXPORT_FORMAT_CSV,
+    EXPORT_FORMAT_PARAM,
+    EXPORT_FORMAT_XLSX,
+    JOB_POLL_SECONDS,
     MENU_MANTENIMIENTOS,
     RELATED_TAG,
+    UBIGEO_CACHE_CONTROL,
+    UBIGEO_VERSION_PARAM,
     XLSX_DATETIME_FORMAT,
 )
 from maintenance.exceptions import FormIsNotValid
+from maintenance.exports import (
+    EXPORT_CONTENT_TYPES,
+    is_format_available,
+    is_typed_field,
+    iter_csv,
+    write_arrow,
+    write_csv,
+    write_xlsx,
+)
 from maintenance.forms import (
     DepartamentoEditForm,
     DistritoEditForm,
@@ -48,11 +79,33 @@ from maintenance.forms import (
     SearchForm,
 )
 from maintenance.history import HistoryList
-from maintenance.models import Departamento, Distrito, Provincia
-from maintenance.utils import validar_si_bool
+from maintenance.imports import (
+    ImportDiff,
+    XlsxRows,
+    get_import_diff,
+    get_import_error_msg,
+    iter_chunks,
+    iter_validated_chunks,
+)
+from maintenance.instrumentation import (
+    QueryLog,
+    action_stats,
+    is_query_budget_enforced,
+    wrap_connections,
+)
+from maintenance.jobs import enqueue_job, set_job_progress
+from maintenance.models import Departamento, Distrito, Job, Provincia
+from maintenance.pagination import CachedCountPaginator, KeysetPaginator
+from maintenance.permissions import PermissionMap, get_permissions_cache_key
+from maintenance.rows import ProjectedObject, RowPlan, get_label_expression, get_row_plan
+from maintenance.search import ContainsSearchBackend
+from maintenance.ubigeo import get_ubigeo_tree
+from maintenance.utils import get_action_url, get_pk_url, validar_si_bool
+from maintenance.versions import bump_model_version, get_model_versions
 from maintenance.webevents import get_webevent
 
 logger = logging.getLogger(__name__)
+JOB_TEMPLATE = "maintenance/components/job.html"
 
 
 class MaintenanceLoginView(LoginView):
@@ -85,6 +138,7 @@ class MaintenanceAPIView(TemplateView):
     import_formclass = ImportForm
     order_by = ("-is_active", "name")
     search_placeholder = "Buscar por nombre"
+    search_backend = ContainsSearchBackend()
     field_list = {
         API_ACTION_EXPORT: ["id", "name"],
         API_ACTION_LIST: ["id", "name", "create_date", "modify_date", "is_active"],
@@ -95,12 +149,36 @@ class MaintenanceAPIView(TemplateView):
     object = None
     object_pk = None
     paginator = None
+    page_obj = None
     object_list = None
     page = 1
     objects_per_page = 20
+    keyset_pagination = False
+    count_cache_timeout = None
+    list_cache_timeout = None
+    list_cache_permissions = (  # the ones read by the list template, part of the cache key
+        API_ACTION_ADD,
+        API_ACTION_EDIT,
+        API_ACTION_DELETE,
+        API_ACTION_HISTORY,
+        API_ACTION_REACTIVATE,
+    )
     form = None
-    user_can = dict()
-    urls = dict()
+    import_in_bulk = False
+    import_batch_size = 500
+    import_workers = 0  # processes validating bulk imports, see get_import_objects()
+    import_diff = False  # bulk imports only write new or changed rows, and can be previewed
+    import_atomic = False  # one transaction per import, rolled back if any row fails
+    import_summary = None
+    export_chunk_size = 2000
+    projection = False  # list and export rows fetched with values_list, see get_projection()
+    projection_fields = dict()  # field_list entry -> column or expression
+    job_actions = tuple()  # import/export actions queued for the run_jobs command
+    job = None  # set when the view runs a job outside a request, see run_job()
+    user_can = None  # per request, see setup()
+    permissions_cache_timeout = None
+    query_budget = dict()  # action -> maximum queries, checked with MAINTENANCE_QUERY_BUDGET
+    urls = None  # per request, see setup()
     menu_active = MENU_MANTENIMIENTOS
     MODAL_SIZE_SM = "modal-sm"
     MODAL_SIZE_LG = "modal-lg"
@@ -113,6 +191,15 @@ class MaintenanceAPIView(TemplateView):
         API_ACTION_EXPORT,
         API_ACTION_IMPORT,
     )
+    actions_with_object = (
+        API_ACTION_EDIT,
+        API_ACTION_DELETE,
+        API_ACTION_REACTIVATE,
+        API_ACTION_READ,
+        API_ACTION_RESET,
+        API_ACTION_HISTORY,
+        API_ACTION_PARTIAL_PLUS,
+    )
     actions_get = (
         API_ACTION_HOME,
         API_ACTION_LIST,
@@ -141,33 +228,103 @@ class MaintenanceAPIView(TemplateView):
     constraints = dict()
     form_show = True
 
+    def setup(self, request, *args, **kwargs):
+        """Give every request its own mutable state, class attributes are shared by threads."""
+        super().setup(request, *args, **kwargs)
+        self.user_can = dict()
+        self.urls = dict()
+
     def dispatch(self, request, *args, **kwargs):
+        if not self.query_budget or not is_query_budget_enforced():
+            return self.dispatch_action(request, *args, **kwargs)
+
+        with wrap_connections(QueryLog()) as query_log:
+            response = self.dispatch_action(request, *args, **kwargs)
+        if (budget := self.get_query_budget()) is None:
+            return response
+
+        label = f"{type(self).__name__} {self.action}"
+        if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+            render = response.render
+
+            def render_within_budget():  # queries made by the template count too
+                with wrap_connections(query_log):
+                    rendered = render()
+                query_log.check_budget(label, budget)
+                return rendered
+
+            response.render = render_within_budget
+        else:
+            query_log.check_budget(label, budget)
+        return response
+
+    def dispatch_action(self, request, *args, **kwargs):
         self.user = request.user
-        self.action = request.path.split("/")[3] or API_ACTION_HOME
+        self.action = self.get_action(kwargs)
         self.object_pk = kwargs.pop("object_pk", None)
         if self.object_pk:
-            qs = self.model.todos.all()
-            if select_related := self.get_select_related():
-                qs = qs.select_related(*select_related)
-
             try:
-                self.object = qs.get(pk=self.object_pk)
-            except self.model.ObjectDoesNotExist:
+                self.object = self.get_object_queryset().get(pk=self.object_pk)
+            except self.model.DoesNotExist:
                 return HttpResponseNotFound()
             else:
-                is_active = True if self.object.is_active is None else self.object.is_active
-                if self.action == API_ACTION_EDIT and not is_active:
+                if self.is_object_action_forbidden():
                     return HttpResponseForbidden()
-        self.page = self.request.GET.get("page", 1)
-        self.model_name = self.model_name or self.model._meta.model_name
-        all_actions_allowed = set(self.actions_get + self.actions_post + self.actions_delete)
-
-        for action in all_actions_allowed:
-            self.user_can[action] = self.user.eval_perm(action, self.model_name, self.object)
 
+        all_actions_allowed = self.init_permissions()
         if not self.user_can[self.action]:
             return HttpResponseForbidden()
 
+        self.init_attributes(all_actions_allowed)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_action(self, kwargs: dict) -> str:
+        """Action passed by maintenance.routers, or the url name of hand-written patterns."""
+        action = kwargs.pop("action", None)
+        if action is None and (match := self.request.resolver_match) is not None:
+            action = match.url_name
+        if action is None:
+            raise ImproperlyConfigured(
+                f"{type(self).__name__} needs the action kwarg, route it with "
+                "maintenance.routers.get_urlpatterns() or name the url after the action."
+            )
+        return action
+
+    @classmethod
+    def get_url_actions(cls) -> tuple:
+        """Actions routed by maintenance.routers, reset only when there is its form."""
+        actions = dict.fromkeys(cls.actions_get + cls.actions_post + cls.actions_delete)
+        if cls.reset_formclass is None:
+            actions.pop(API_ACTION_RESET, None)
+        return tuple(actions)
+
+    def get_object_queryset(self) -> QuerySet:
+        qs = self.model.todos.all()
+        if select_related := self.get_select_related():
+            qs = qs.select_related(*select_related)
+        return qs
+
+    def is_object_action_forbidden(self) -> bool:
+        is_active = True if self.object.is_active is None else self.object.is_active
+        return self.action == API_ACTION_EDIT and not is_active
+
+    def get_query_budget(self) -> int | None:
+        """query_budget of the action plus the queries the host adds to every action, e.g. in
+        eval_perm or its middlewares, given by MAINTENANCE_QUERY_BUDGET_EXTRA.
+        """
+        budget = self.query_budget.get(self.action)
+        if budget is None:
+            return None
+        return budget + getattr(settings, "MAINTENANCE_QUERY_BUDGET_EXTRA", 0)
+
+    def init_permissions(self) -> set:
+        self.page = self.request.GET.get("page", 1)
+        self.model_name = self.model_name or self.model._meta.model_name
+        all_actions_allowed = set(self.actions_get + self.actions_post + self.actions_delete)
+        self.user_can = self.get_user_can(all_actions_allowed)
+        return all_actions_allowed
+
+    def init_attributes(self, all_actions_allowed: set) -> None:
         self.app = self.model._meta.app_label
         self.nombre = self.model._meta.verbose_name.title()
         self.nombre_plural = self.model._meta.verbose_name_plural.title()
@@ -177,11 +334,26 @@ class MaintenanceAPIView(TemplateView):
         base_url = f"{self.app}:{self.model_name}"
         for action in self.actions_with_no_object:
             if action in all_actions_allowed:
-                self.urls[action] = reverse(f"{base_url}:{action}")
+                self.urls[action] = get_action_url(f"{base_url}:{action}")
 
         if not self.upload_files:  # if not explicitly enabled, check if action is import
             self.upload_files = self.action == API_ACTION_IMPORT
-        return super().dispatch(request, *args, **kwargs)
+
+    def eval_perm(self, action: str) -> bool:
+        return self.user.eval_perm(action, self.model_name, self.object)
+
+    def get_permissions_cache_key(self) -> str | None:
+        if self.permissions_cache_timeout is None or self.object is not None:
+            return None  # permissions over a single object are only kept during the request
+        return get_permissions_cache_key(self.user, self.model_name)
+
+    def get_user_can(self, actions) -> PermissionMap:
+        return PermissionMap(
+            actions,
+            self.eval_perm,
+            cache_key=self.get_permissions_cache_key(),
+            timeout=self.permissions_cache_timeout,
+        )
 
     def get_template_names(self):
         template_suffix = (
@@ -199,6 +371,8 @@ class MaintenanceAPIView(TemplateView):
             )
         elif self.action == API_ACTION_READ:
             kwargs.update({"readonly": True})
+        elif self.action == API_ACTION_IMPORT and self.import_diff and self.import_in_bulk:
+            kwargs.update({"dry_run": True})  # the diff is only applied by bulk imports
         return kwargs
 
     def get_order_by(self):
@@ -215,6 +389,13 @@ class MaintenanceAPIView(TemplateView):
             qs = qs.order_by(*order_by)
         return qs
 
+    def get_paginator(self, qs: QuerySet):
+        if self.keyset_pagination:  # no COUNT(*) nor OFFSET, pages are browsed with cursors
+            return KeysetPaginator(qs, self.objects_per_page)
+        return CachedCountPaginator(
+            qs, self.objects_per_page, count_cache_timeout=self.count_cache_timeout
+        )
+
     def get_queryset(self):
         self.form = self.search_formclass(self.request.GET, **self.get_form_kwargs())
         if self.form.is_valid():
@@ -235,21 +416,20 @@ class MaintenanceAPIView(TemplateView):
         context["upload_files"] = self.upload_files
         context["modal_readonly"] = self.action in (API_ACTION_READ, API_ACTION_HISTORY)
         context["user_can"] = self.user_can
+        context["job_actions"] = self.job_actions
         context["urls"] = self.urls
         context["user"] = self.user
         context["object"] = self.object
         context["form_show"] = self.form_show
         context["model_name"] = self.model_name
         if self.action == API_ACTION_LIST:
-            row_list = list()
             fields_list = self.field_list[self.action]
-            page_obj = self.paginator.get_page(self.page)
+            if (page_obj := self.page_obj) is None:
+                page_obj = self.paginator.get_page(self.page)
             self.object_list = page_obj.object_list
-            for obj in self.object_list:
-                row_list.append(obj.get_row_data(fields_list))
 
             context["header_list"] = self.model.get_headers_list(fields_list)
-            context["row_list"] = row_list
+            context["row_list"] = self.get_row_list(fields_list)
             context["page_obj"] = page_obj
             context["pages"] = self.paginator.get_elided_page_range(self.page)
             context["related_length"] = len(fields_list) + 1
@@ -263,6 +443,100 @@ class MaintenanceAPIView(TemplateView):
         context.update(self.update_context())
         return self.render_to_response(context, **kwargs)
 
+    def get_cache_models(self) -> list:
+        """Models whose writes change the list: the view model and its select_related ones."""
+        cache_models = [self.model]
+        for path in self.get_select_related():
+            model = self.model
+            for field_name in path.split("__"):
+                model = model._meta.get_field(field_name).related_model
+                cache_models.append(model)
+        return list(dict.fromkeys(cache_models))
+
+    def get_list_cache_key(self) -> str:
+        fingerprint = (
+            self.request.path,
+            sorted(self.request.GET.lists()),
+            get_model_versions(*self.get_cache_models()),
+            [self.user_can[action] for action in self.list_cache_permissions],
+        )
+        digest = hashlib.md5(repr(fingerprint).encode(), usedforsecurity=False).hexdigest()
+        return f"maintenance:list:{digest}"
+
+    def render_cached_list(self, **kwargs):
+        """List fragment cached until the table version changes, answering 304 when unchanged."""
+        key = self.get_list_cache_key()
+        etag = quote_etag(key.rpartition(":")[2])
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag in parse_etags(self.request.headers.get("If-None-Match", "")):
+            return HttpResponseNotModified(headers=headers)
+
+        content = cache.get(key)
+        if content is None:
+            self.paginator = self.get_paginator(self.get_queryset())
+            content = self._render_html(**kwargs).render().content
+            cache.set(key, content, self.list_cache_timeout)
+        return HttpResponse(content, headers=headers)
+
+    def get_row_plan(self, fields_list) -> RowPlan:
+        return get_row_plan(self.model, tuple(fields_list))
+
+    def get_row_list(self, fields_list) -> list:
+        plan = self.get_row_plan(fields_list)
+        if self.projection and isinstance(self.object_list, QuerySet):
+            names = ["pk", "is_active", *fields_list]
+            values_list = self.object_list.values_list(
+                "pk", self.get_is_active_column(), *self.get_projection(fields_list)
+            )
+            labels = self.get_projected_labels(fields_list)
+            return plan.get_projected_rows(self.model, names, values_list, labels)
+        return plan.get_rows(self.object_list)
+
+    def get_projection(self, fields_list) -> list:
+        """Column or expression fetched by the database for each entry of fields_list.
+
+        projection_fields takes precedence. Foreign keys to catalogues are resolved to the
+        label of the related row, other fields to their own column.
+        """
+        columns = list()
+        for field_name in fields_list:
+            if field_name in self.projection_fields:
+                columns.append(self.projection_fields[field_name])
+                continue
+            try:
+                field = self.model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{type(self).__name__}.projection_fields needs an entry for {field_name}"
+                )
+            related_model = field.related_model if field.many_to_one else None
+            if related_model is not None and hasattr(related_model, "get_label"):
+                columns.append(get_label_expression(field_name, related_model.DELETED_TEXT))
+            elif related_model is not None:
+                columns.append(f"{field_name}__pk")
+            else:
+                columns.append(field_name)
+        return columns
+
+    def get_projected_labels(self, fields_list) -> frozenset:
+        """Entries of fields_list that get_projection() fetches as the text displayed."""
+        return frozenset(
+            field_name
+            for field_name in fields_list
+            if field_name in self.projection_fields
+            or (
+                (field := self.model._meta.get_field(field_name)).many_to_one
+                and hasattr(field.related_model, "get_label")
+            )
+        )
+
+    def get_is_active_column(self):
+        try:
+            self.model._meta.get_field("is_active")
+        except FieldDoesNotExist:
+            return Value(None, output_field=BooleanField())
+        return "is_active"
+
     def render_no_html(self, success, msg):
         if not self.webevent:
             self.webevent = get_webevent(self.action)
@@ -280,7 +554,9 @@ class MaintenanceAPIView(TemplateView):
             kwargs.update({"headers": {"HX-Trigger": "ForceSearch"}})  # TODO is still being used?
             self.form = self.search_formclass(request.GET, **self.get_form_kwargs())
         elif self.action == API_ACTION_LIST:
-            self.paginator = Paginator(self.get_queryset(), self.objects_per_page)
+            if self.list_cache_timeout is not None:
+                return self.render_cached_list(**kwargs)
+            self.paginator = self.get_paginator(self.get_queryset())
         elif self.action == API_ACTION_READ:
             self.form = self.edit_formclass(instance=self.object, **self.get_form_kwargs())
         elif self.action in (API_ACTION_PARTIAL, API_ACTION_PARTIAL_PLUS):
@@ -288,9 +564,14 @@ class MaintenanceAPIView(TemplateView):
                 request.GET, instance=self.object, **self.get_form_kwargs()
             )
         elif self.action == API_ACTION_EXPORT:
-            return self.render_xlsx()
+            if self.action in self.job_actions:
+                return self.render_job(enqueue_job(self))
+            return self.render_export()
         elif self.action == API_ACTION_HISTORY:
-            self.form = HistoryList(self.object).get_accordion()
+            history = HistoryList(self.object, cursor=request.GET.get("page"), url=request.path)
+            if history.cursor:  # older events requested by the infinite scroll
+                return HttpResponse(history.get_accordion_page())
+            self.form = history.get_accordion()
         elif self.action == API_ACTION_IMPORT:
             self.form = self.import_formclass(**self.get_form_kwargs())
         elif self.action == API_ACTION_RESET:
@@ -320,6 +601,10 @@ class MaintenanceAPIView(TemplateView):
 
         if self.form.is_valid():
             if self.action == API_ACTION_IMPORT:
+                if self.form.cleaned_data.get("dry_run"):
+                    return self.preview_import(**kwargs)
+                if self.action in self.job_actions:
+                    return self.render_job(enqueue_job(self, self.form.cleaned_data["file"]))
                 return self.import_xlsx()
             try:
                 self.form_valid_edit()
@@ -356,59 +641,141 @@ class MaintenanceAPIView(TemplateView):
     def form_valid_search(self, qs: QuerySet, cleaned_data: dict) -> QuerySet:
         param = cleaned_data["param"]
         if param:
-            qs = qs.filter(name__icontains=param)
+            qs = self.search_backend.filter(qs, param)
         return qs
 
     def render_xlsx(self):
-        row_list = list()
-        filename = f"{self.nombre_plural}_{timezone.now().strftime(XLSX_DATETIME_FORMAT)}.xlsx"
-        fields_list = self.field_list[self.action]  # API_ACTION_EXPORT
-        headers_list = self.model.get_headers_list(fields_list)
-        for obj in self.get_queryset():
-            row_list.append(obj.get_row_data(fields_list))
-
-        dataset = Dataset()
-        dataset.headers = headers_list
-        for row in row_list:
-            dataset.append([validar_si_bool(i["value"]) for i in row["data"]])
-        dataset.title = self.nombre_plural.upper()
-        response = HttpResponse(dataset.xlsx, content_type=CONTENT_TYPE_XLSX)
-        response["Content-Disposition"] = f"attachment; filename={filename}"
-        return response
+        return self.render_export(EXPORT_FORMAT_XLSX)
 
-    def import_xlsx(self):
-        file_to_import = self.form.cleaned_data["file"]
-        dataset = Dataset().load(file_to_import, format="xlsx")
+    def get_export_format(self) -> str:
+        return self.request.GET.get(EXPORT_FORMAT_PARAM) or EXPORT_FORMAT_XLSX
 
-        if not dataset.headers:
-            return self.render_no_html(success=False, msg="Error con el archivo")
+    def get_export_filename(self, export_format: str) -> str:
+        timestamp = timezone.now().strftime(XLSX_DATETIME_FORMAT)
+        return f"{self.nombre_plural}_{timestamp}.{export_format}"
 
-        clean_headers = [h for h in dataset.headers if h is not None]
+    def render_export(self, export_format: str | None = None):
+        """XLSX, CSV, Parquet or Arrow export, chosen through the "format" querystring parameter.
 
-        new = 0
-        empty = 0
-        errors = 0
-        msg_error = ""
-        for data in dataset.dict:
-            cleaned_data = {k: v for k, v in data.items() if k in clean_headers}
-            if not any(cleaned_data.values()):
-                empty += 1
-                continue
+        CSV is streamed while it is generated, the other formats are spooled on disk first.
+        """
+        export_format = export_format or self.get_export_format()
+        if not is_format_available(export_format):
+            return HttpResponseBadRequest()
+
+        filename = self.get_export_filename(export_format)
+        if export_format == EXPORT_FORMAT_CSV:
+            response = StreamingHttpResponse(
+                iter_csv(self.get_export_headers(), self.iter_export_rows()),
+                content_type=CONTENT_TYPE_CSV,
+            )
+            response.headers["Content-Disposition"] = content_disposition_header(True, filename)
+            return response
+
+        file_to_export = tempfile.TemporaryFile()
+        self.write_export(file_to_export, export_format)
+        file_to_export.seek(0)
+        return FileResponse(
+            file_to_export,
+            as_attachment=True,
+            filename=filename,
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
+
+    def get_export_headers(self) -> list:
+        return self.model.get_headers_list(self.field_list[API_ACTION_EXPORT])
 
+    def get_export_fields(self) -> list:
+        """Model field of each exported column, None for the columns exported as their text."""
+        fields = list()
+        for field_name in self.field_list[API_ACTION_EXPORT]:
             try:
-                self.form_valid_import(cleaned_data)
-            except Exception as e:  # NOQA
-                errors += 1
-                msg_error += ", ".join(e.messages) if hasattr(e, "messages") else str(e)
-                logger.error(f"{msg_error}. Error: {e}")
-                continue
+                field = self.model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                field = None
+            fields.append(field if is_typed_field(field) else None)
+        return fields
+
+    def iter_export_rows(self, typed: bool = False):
+        """Rows of displayed values. With typed, the columns of a model field hold its raw value
+        instead, for the typed columns of Parquet and Arrow, see get_export_fields().
+        """
+        fields_list = self.field_list[API_ACTION_EXPORT]
+        fields = self.get_export_fields() if typed else [None] * len(fields_list)
+        qs = self.get_queryset()
+        total = qs.count() if self.job else 0
+        if self.projection:  # only the exported columns, without model instances
+            rows = qs.values_list(*self.get_projection(fields_list))
+            labels = self.get_projected_labels(fields_list)
+        else:
+            rows = qs
+        for i, row in enumerate(rows.iterator(chunk_size=self.export_chunk_size), start=1):
+            if self.projection:
+                row = ProjectedObject(self.model, dict(zip(fields_list, row)), labels)
+            data = self.model.get_row_data(row, fields_list)["data"]
+            yield [
+                getattr(row, field_name) if field else validar_si_bool(cell["value"])
+                for field_name, field, cell in zip(fields_list, fields, data)
+            ]
+            if i % self.export_chunk_size == 0:
+                self.report_progress(i, total)
+
+    def write_export(self, file_to_export, export_format: str) -> None:
+        headers = self.get_export_headers()
+        if export_format == EXPORT_FORMAT_XLSX:
+            write_xlsx(file_to_export, self.nombre_plural.upper(), headers, self.iter_export_rows())
+        elif export_format == EXPORT_FORMAT_CSV:
+            write_csv(file_to_export, headers, self.iter_export_rows())
+        else:
+            rows = self.iter_export_rows(typed=True)
+            fields = self.get_export_fields()
+            write_arrow(
+                file_to_export, headers, rows, export_format, self.export_chunk_size, fields
+            )
+
+    def import_xlsx(self):
+        success, msg = self.run_import(self.form.cleaned_data["file"])
+        return self.render_no_html(success, msg)
+
+    def preview_import(self, **kwargs):
+        """Dry run: show what an import would change, without writing anything."""
+        try:
+            rows = XlsxRows(self.form.cleaned_data["file"])
+        except Exception as e:  # NOQA
+            logger.error(f"Error reading import file: {e}")
+            self.form.add_error(None, "Error con el archivo")
+        else:
+            self.form.import_summary = ImportDiff()
+            for objs, row_errors in self.get_import_objects(rows):
+                self.form.import_summary.update(self.get_import_diff(rows, objs, row_errors))
+            for row_number, error in self.form.import_summary.invalid:
+                self.form.add_error(None, f"Fila {row_number}: {error}")
+        self.form.format_errors()
+        return self._render_html(**kwargs)
+
+    def run_import(self, file_to_import) -> tuple[bool, str]:
+        try:
+            rows = XlsxRows(file_to_import)
+        except Exception as e:  # NOQA
+            logger.error(f"Error reading import file: {e}")
+            return False, "Error con el archivo"
+
+        with transaction.atomic() if self.import_atomic else nullcontext():
+            if self.import_in_bulk:
+                new, row_errors = self.import_rows_in_bulk(rows)
+                # bulk_create does not go through save()
+                transaction.on_commit(partial(bump_model_version, self.model))
             else:
-                new += 1
+                new, row_errors = self.import_rows(rows)
+            if row_errors and self.import_atomic:  # all or nothing
+                transaction.set_rollback(True)
+                new = 0
 
-        if empty > 10:
-            logger.error(f"{msg_error}. Empty lines: {empty}")
+        msg_error = "; ".join(f"Fila {row_number}: {error}" for row_number, error in row_errors)
+        if rows.empty > 10:
+            logger.error(f"{msg_error}. Empty lines: {rows.empty}")
 
-        success = errors == 0
+        success = not row_errors
         msg = (
             (
                 f"{new} {self.nombre.title() if new == 1 else self.nombre_plural.title()} "
@@ -417,10 +784,147 @@ class MaintenanceAPIView(TemplateView):
             if success
             else msg_error
         )
-        return self.render_no_html(success, msg)
+        if success and self.import_summary:
+            msg = self.import_summary.get_summary()
+        return success, msg
+
+    def import_rows(self, rows: XlsxRows) -> tuple[int, list]:
+        """Save rows one by one through form_valid_import().
+
+        An atomic import saves chunks of import_batch_size rows in savepoints, a chunk with any
+        failing row is rolled back and replayed row by row to report its errors.
+        """
+        new = 0
+        row_errors = list()
+        for chunk in iter_chunks(rows, self.import_batch_size):
+            if self.import_atomic:
+                new += self.import_chunk(chunk, row_errors)
+            else:
+                for row_number, cleaned_data in chunk:
+                    try:
+                        self.form_valid_import(cleaned_data)
+                    except Exception as e:  # NOQA
+                        row_errors.append((row_number, get_import_error_msg(e)))
+                        logger.error(f"Error importing row {row_number}: {e}")
+                    else:
+                        new += 1
+            self.report_progress(rows.read, rows.total)
+        return new, row_errors
+
+    def import_chunk(self, chunk: list, row_errors: list) -> int:
+        try:
+            with transaction.atomic():
+                for _, cleaned_data in chunk:
+                    self.form_valid_import(cleaned_data)
+                self.check_import_constraints()
+        except Exception as e:  # NOQA
+            logger.error(f"Error importing chunk starting at row {chunk[0][0]}: {e}")
+        else:
+            return len(chunk)
+        new = 0
+        for row_number, cleaned_data in chunk:
+            try:
+                with transaction.atomic():
+                    self.form_valid_import(cleaned_data)
+                    self.check_import_constraints()
+            except Exception as e:  # NOQA
+                row_errors.append((row_number, get_import_error_msg(e)))
+                logger.error(f"Error importing row {row_number}: {e}")
+            else:
+                new += 1
+        return new
+
+    def import_rows_in_bulk(self, rows: XlsxRows) -> tuple[int, list]:
+        """Validate chunks of import_batch_size rows while the sheet is read, and upsert each one.
+
+        The pghistory triggers work at database level, so every inserted or updated row keeps
+        its event. A chunk rejected by the database is retried row by row to report its errors.
+        """
+        new = 0
+        row_errors = list()
+        if self.import_diff:
+            self.import_summary = ImportDiff()
+        for objs, chunk_errors in self.get_import_objects(rows):
+            row_errors += chunk_errors
+            if self.import_diff:  # unchanged rows cost no write and no pghistory event
+                diff = self.get_import_diff(rows, objs, chunk_errors)
+                self.import_summary.update(diff)
+                objs = diff.changes
+            if objs:
+                new += self.bulk_import_chunk(objs, row_errors)
+            self.report_progress(rows.read, rows.total)
+        row_errors.sort(key=lambda error: error[0])
+        return new, row_errors
+
+    def bulk_import_chunk(self, objs: list, row_errors: list) -> int:
+        try:
+            with transaction.atomic():
+                self.bulk_save_import([obj for _, obj in objs])
+                self.check_import_constraints()
+        except Exception as e:  # NOQA
+            logger.error(f"Error importing chunk starting at row {objs[0][0]}: {e}")
+        else:
+            return len(objs)
+        new = 0
+        for row_number, obj in objs:
+            try:
+                with transaction.atomic():
+                    self.bulk_save_import([obj])
+                    self.check_import_constraints()
+            except Exception as e:  # NOQA
+                row_errors.append((row_number, get_import_error_msg(e)))
+            else:
+                new += 1
+        return new
+
+    def get_import_objects(self, rows: XlsxRows):
+        """(objs, row_errors) of every chunk, see iter_validated_chunks().
+
+        The worker processes build objects with model(**data), so import_workers is ignored
+        when get_import_object() is overridden.
+        """
+        overridden = type(self).get_import_object is not MaintenanceAPIView.get_import_object
+        return iter_validated_chunks(
+            self.model,
+            rows,
+            chunk_size=self.import_batch_size,
+            workers=0 if overridden else self.import_workers,
+            build=self.get_import_object if overridden else None,
+        )
+
+    def check_import_constraints(self) -> None:
+        """Deferred foreign keys are only checked at COMMIT. Inside an atomic import check them at
+        the end of each savepoint, so a bad batch rolls back alone instead of the whole import.
+        """
+        if self.import_atomic:
+            transaction.get_connection().check_constraints()
+
+    def get_import_diff(self, rows: XlsxRows, objs: list, row_errors: list) -> ImportDiff:
+        headers = set(rows.headers)
+        fields = [
+            f
+            for f in self.model._meta.concrete_fields
+            if not f.primary_key and (f.name in headers or f.attname in headers)
+        ]
+        return get_import_diff(self.model, objs, row_errors, fields)
+
+    def bulk_save_import(self, objs: list) -> None:
+        meta = self.model._meta
+        update_fields = [
+            f.name
+            for f in meta.concrete_fields
+            if not f.primary_key and not getattr(f, "auto_now_add", False) and f.editable
+        ]
+        update_fields += [f.name for f in meta.concrete_fields if getattr(f, "auto_now", False)]
+        self.model._base_manager.bulk_create(
+            objs, update_conflicts=True, unique_fields=[meta.pk.name], update_fields=update_fields
+        )
+
+    def get_import_object(self, cleaned_data: dict):
+        return self.model(**cleaned_data)
 
     def form_valid_import(self, cleaned_data: dict) -> None:
-        obj = self.model(**cleaned_data)
+        obj = self.get_import_object(cleaned_data)
         obj.save()
 
     def form_valid_edit(self, obj=None):
@@ -444,6 +948,47 @@ class MaintenanceAPIView(TemplateView):
             self.form.add_error(None, ", ".join(e.messages))
             raise FormIsNotValid
 
+    def render_job(self, job: Job):
+        return render(self.request, JOB_TEMPLATE, get_job_context(job))
+
+    def setup_job(self, job: Job) -> None:
+        """Rebuild the state dispatch() gives the view, from the request stored in the job."""
+        request = HttpRequest()
+        request.user = job.user
+        request.GET = QueryDict(mutable=True)
+        for key, values in job.params.items():
+            request.GET.setlist(key, values)
+        self.setup(request)
+        self.job = job
+        self.user = job.user
+        self.action = job.action
+        self.init_attributes(self.init_permissions())
+
+    def run_job(self, job: Job) -> tuple[bool, str]:
+        """Executed by the run_jobs command, returns the success and message of the action."""
+        self.setup_job(job)
+        if self.action == API_ACTION_IMPORT:
+            with job.input_file.open("rb") as file_to_import:
+                return self.run_import(file_to_import)
+        elif self.action == API_ACTION_EXPORT:
+            export_format = self.get_export_format()
+            if not is_format_available(export_format):
+                return False, f"Formato {export_format} no disponible"
+            filename = self.get_export_filename(export_format)
+            with tempfile.TemporaryFile() as file_to_export:
+                self.write_export(file_to_export, export_format)
+                file_to_export.seek(0)
+                job.result_file.save(filename, File(file_to_export), save=False)
+            return True, filename
+        return False, f"Acción {self.action} no soportada"
+
+    def report_progress(self, done: int, total: int) -> None:
+        """Progress of the running job. An atomic import only shows it once it has finished, the
+        progress written inside its transaction would not be seen before the COMMIT.
+        """
+        if self.job is not None and not (self.action == API_ACTION_IMPORT and self.import_atomic):
+            set_job_progress(self.job, done, total)
+
     def get_modal_size(self):
         return (
             self.MODAL_SIZE_SM
@@ -475,9 +1020,9 @@ class RelatedMaintenanceAPIView(MaintenanceAPIView):
     is_related = True
     button_no_text = True
 
-    def dispatch(self, request, *args, **kwargs):
+    def dispatch_action(self, request, *args, **kwargs):
         self.user = request.user
-        self.action = request.path.split("/")[5] or API_ACTION_LIST
+        self.action = self.get_action(kwargs)
         self.object_pk = kwargs.pop("object_pk", None)
         self.parent_pk = kwargs.pop("parent_pk")
         if self.parent_pk:
@@ -499,11 +1044,7 @@ class RelatedMaintenanceAPIView(MaintenanceAPIView):
         self.parent_model_name = self.parent_model._meta.model_name
         self.model_name = self.model_name or self.model._meta.model_name
         all_actions_allowed = set(self.actions_get + self.actions_post + self.actions_delete)
-
-        for action in all_actions_allowed:
-            self.user_can[action] = self.user.eval_perm_related(
-                action, self.parent_model_name, self.parent_object, self.object
-            )
+        self.user_can = self.get_user_can(all_actions_allowed)
 
         if not self.user_can[self.action]:
             return HttpResponseForbidden()
@@ -518,7 +1059,7 @@ class RelatedMaintenanceAPIView(MaintenanceAPIView):
         base_url = f"{self.app}:{self.parent_model_name}:{self.model_name}"
         for action in self.actions_with_no_object:
             if action in all_actions_allowed:
-                self.urls[action] = reverse(f"{base_url}:{action}", args=(self.parent_pk,))
+                self.urls[action] = get_pk_url(f"{base_url}:{action}", self.parent_pk)
 
         # Default
         if request.method.lower() in self.http_method_names:
@@ -527,6 +1068,18 @@ class RelatedMaintenanceAPIView(MaintenanceAPIView):
             handler = self.http_method_not_allowed
         return handler(request, *args, **kwargs)
 
+    def eval_perm(self, action: str) -> bool:
+        return self.user.eval_perm_related(
+            action, self.parent_model_name, self.parent_object, self.object
+        )
+
+    def get_permissions_cache_key(self) -> str | None:
+        if self.permissions_cache_timeout is None or self.object is not None:
+            return None
+        return get_permissions_cache_key(
+            self.user, self.parent_model_name, self.parent_pk, self.model_name
+        )
+
     def get_template_names(self):
         template_suffix = (
             API_ACTION_LIST if self.action in self.actions_with_no_template else self.action
@@ -561,9 +1114,165 @@ class RelatedMaintenanceAPIView(MaintenanceAPIView):
         super().form_valid_edit(obj)
 
 
+class AsyncMaintenanceAPIView(MaintenanceAPIView):
+    """ASGI native MaintenanceAPIView, one worker serves many concurrent searches and pages.
+
+    Object lookup and the list action (search and pagination) use the async ORM. Templates
+    and the remaining actions, which validate forms and write, run in a thread through
+    sync_to_async so pghistory triggers and model save() overrides keep working.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.user = await request.auser()
+        self.action = self.get_action(kwargs)
+        self.object_pk = kwargs.pop("object_pk", None)
+        if self.object_pk:
+            try:
+                self.object = await self.get_object_queryset().aget(pk=self.object_pk)
+            except self.model.DoesNotExist:
+                return HttpResponseNotFound()
+            else:
+                if self.is_object_action_forbidden():
+                    return HttpResponseForbidden()
+
+        all_actions_allowed, allowed = await sync_to_async(self.init_action_permissions)()
+        if not allowed:
+            return HttpResponseForbidden()
+
+        self.init_attributes(all_actions_allowed)
+        if request.method.lower() in self.http_method_names:
+            handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+        else:
+            handler = self.http_method_not_allowed
+        return await handler(request, *args, **kwargs)
+
+    def init_action_permissions(self) -> tuple[set, bool]:
+        """init_permissions() and the permission of the action, in one thread hop. Both may read
+        the cache and the permissions cache key, and run eval_perm, none of them async.
+        """
+        all_actions_allowed = self.init_permissions()
+        return all_actions_allowed, self.user_can[self.action]
+
+    async def get(self, request, *args, **kwargs):
+        if (
+            self.action != API_ACTION_LIST
+            or self.action not in self.actions_get
+            or self.list_cache_timeout is not None
+        ):
+            return await sync_to_async(super().get)(request, *args, **kwargs)
+
+        self.paginator = self.get_paginator(self.get_queryset())
+        self.page_obj = await self.paginator.aget_page(self.page)
+        return await sync_to_async(self._render_html)(**kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await sync_to_async(super().post)(request, *args, **kwargs)
+
+    async def delete(self, request, *args, **kwargs):
+        return await sync_to_async(super().delete)(request, *args, **kwargs)
+
+
+def get_job_context(job: Job) -> dict:
+    return {
+        "job": job,
+        "modal_title": API_ACTION_MODAL_TITLE.get(job.action),
+        "poll_seconds": JOB_POLL_SECONDS,
+    }
+
+
+class JobAPIView(View):
+    """Progress of a queued import/export, polled by the modal, and download of its result.
+
+    A finished import answers with the same HX-Trigger webevent as a synchronous import.
+    """
+
+    def get(self, request, job_id, *args, **kwargs):
+        if not request.user.is_authenticated:  # user__pk=None would match the jobs with no user
+            return HttpResponseNotFound()
+        job = get_object_or_404(Job, pk=job_id, user=request.user)
+        if kwargs.get("result"):
+            if not (job.success and job.result_file):
+                return HttpResponseNotFound()
+            filename = os.path.basename(job.result_file.name)
+            return FileResponse(
+                job.result_file.open("rb"),
+                as_attachment=True,
+                filename=filename,
+                content_type=EXPORT_CONTENT_TYPES.get(os.path.splitext(filename)[1][1:]),
+            )
+
+        if job.is_finished and job.action == API_ACTION_IMPORT:
+            webevent = get_webevent(job.action)
+            return HttpResponse(
+                status=204,
+                headers={"HX-Trigger": json.dumps(webevent.get_event(job.success, job.message))},
+            )
+        return render(request, JOB_TEMPLATE, get_job_context(job))
+
+
+class UbigeoAPIView(View):
+    """Active departamentos, provincias and distritos for the cascading selects of UbigeoFormMixin.
+
+    The ETag is the version of the ubigeo tree, its latest pghistory events. The url with the
+    current version is cached for good, any other is revalidated on every use.
+    """
+
+    def get(self, request, *args, **kwargs):
+        tree = get_ubigeo_tree()
+        etag = quote_etag(tree.etag)
+        cache_control = (
+            UBIGEO_CACHE_CONTROL
+            if request.GET.get(UBIGEO_VERSION_PARAM) == tree.etag
+            else "public, no-cache"
+        )
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return HttpResponseNotModified(headers=headers)
+        return HttpResponse(tree.json, content_type="application/json", headers=headers)
+
+
+class ActionStatsView(View):
+    """Totals per model and action collected by ActionInstrumentationMiddleware in this process.
+
+    Superusers only, a DELETE starts them again.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_superuser:
+            return HttpResponseForbidden()
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(
+            {
+                "pid": os.getpid(),
+                "since": action_stats.since.isoformat(),
+                "actions": action_stats.get_stats(),
+            }
+        )
+
+    def delete(self, request, *args, **kwargs):
+        action_stats.reset()
+        return HttpResponse(status=204)
+
+
 class DepartamentoAPIView(MaintenanceAPIView):
     model = Departamento
     edit_formclass = DepartamentoEditForm
+    search_backend = ContainsSearchBackend(prefix_fields=("codigo",))
+    search_placeholder = "Buscar por nombre o código"
+    query_budget = {  # queries of this app, see get_query_budget()
+        API_ACTION_HOME: 0,
+        API_ACTION_ADD: 1,
+        API_ACTION_EDIT: 2,
+        API_ACTION_DELETE: 2,
+        API_ACTION_REACTIVATE: 2,
+        API_ACTION_LIST: 2,
+        API_ACTION_PARTIAL: 0,
+        API_ACTION_EXPORT: 1,
+        API_ACTION_READ: 1,
+        API_ACTION_HISTORY: 4,  # object, latest event, events, users
+    }
     field_list = {
         API_ACTION_EXPORT: ["codigo", "name"],
         API_ACTION_LIST: ["codigo", "name", "create_date", "modify_date", "is_active"],
@@ -573,8 +1282,22 @@ class DepartamentoAPIView(MaintenanceAPIView):
 class ProvinciaAPIView(MaintenanceAPIView):
     model = Provincia
     edit_formclass = ProvinciaEditForm
+    search_backend = ContainsSearchBackend(prefix_fields=("codigo",))
+    search_placeholder = "Buscar por nombre o código"
     select_related = ("departamento",)
     order_by = ("-is_active", "codigo")
+    query_budget = {  # queries of this app, see get_query_budget()
+        API_ACTION_HOME: 0,
+        API_ACTION_ADD: 4,
+        API_ACTION_EDIT: 4,
+        API_ACTION_DELETE: 2,
+        API_ACTION_REACTIVATE: 2,
+        API_ACTION_LIST: 2,
+        API_ACTION_PARTIAL: 1,
+        API_ACTION_EXPORT: 1,
+        API_ACTION_READ: 2,
+        API_ACTION_HISTORY: 5,  # object, latest event, events, users, departamentos
+    }
     field_list = {
         API_ACTION_EXPORT: ["codigo", "name", "departamento"],
         API_ACTION_LIST: [
@@ -591,8 +1314,25 @@ class ProvinciaAPIView(MaintenanceAPIView):
 class DistritoAPIView(MaintenanceAPIView):
     model = Distrito
     edit_formclass = DistritoEditForm
+    search_backend = ContainsSearchBackend(prefix_fields=("codigo",))
+    search_placeholder = "Buscar por nombre o código"
     select_related = ("provincia", "provincia__departamento")
     order_by = ("-is_active", "codigo")
+    projection_fields = {
+        "departamento": get_label_expression("provincia__departamento", Distrito.DELETED_TEXT)
+    }
+    query_budget = {  # queries of this app, see get_query_budget()
+        API_ACTION_HOME: 0,
+        API_ACTION_ADD: 4,
+        API_ACTION_EDIT: 4,
+        API_ACTION_DELETE: 2,
+        API_ACTION_REACTIVATE: 2,
+        API_ACTION_LIST: 2,
+        API_ACTION_PARTIAL: 1,
+        API_ACTION_EXPORT: 1,
+        API_ACTION_READ: 2,
+        API_ACTION_HISTORY: 5,  # object, latest event, events, users, provincias
+    }
     field_list = {
         API_ACTION_EXPORT: ["codigo", "name", "provincia", "departamento"],
         API_ACTION_LIST: [
@@ -15,4 +15,5 @@ setup(
         "tablib[xlsx]>=3.9.0",
         "python-magic>=0.4.27",
     ],
+    extras_require={"arrow": ["pyarrow>=15.0"]},
 )